@@ -0,0 +1,195 @@
+import numpy as np
+import pandas as pd
+
+from collections import deque
+
+
+MA_WINDOWS = (20, 50, 100, 200)
+FIFTY_TWO_WEEKS = 252  # in trading days
+SIGMA_WINDOW = 20
+
+
+def _get_ma_colname(n):
+  return f"ma_{n}"
+
+
+class IndicatorPanel:
+  """
+  Rolling indicators of daily closes stored as contiguous column arrays, one
+  row per bar. Indicators at any index are constant time lookups and
+  appending a bar is amortized constant time.
+
+  Moving averages and sigma are differences of cumulative sums, and 52 week
+  extremes keep monotonic deques of the indexes still in the window.
+  """
+
+  _INITIAL_CAPACITY = 512
+
+  def __init__(self, dates, closes, ma_windows=MA_WINDOWS, extreme_window=FIFTY_TWO_WEEKS, sigma_window=SIGMA_WINDOW):
+    self.ma_windows = tuple(ma_windows)
+    self.extreme_window = extreme_window
+    self.sigma_window = sigma_window
+
+    dates = np.asarray(dates, dtype='datetime64[ns]')
+    closes = np.asarray(closes, dtype=float)
+    self._size = len(closes)
+    self._columns = dict()
+
+    changes = np.concatenate([[np.nan], np.log(closes[1:] / closes[:-1])])
+    is_change = np.isfinite(changes)
+    changes_or_zero = np.where(is_change, changes, 0)
+
+    # Cumulative sums are offset by one so sums over rows [i, j) are cumsum[j] - cumsum[i].
+    self._set('date', dates)
+    self._set('close', closes)
+    self._set('change', changes)
+    self._set('cumsum_close', np.cumsum(closes), offset=True)
+    self._set('cumsum_count', np.cumsum(is_change), offset=True)
+    self._set('cumsum_change', np.cumsum(changes_or_zero), offset=True)
+    self._set('cumsum_change_sq', np.cumsum(changes_or_zero**2), offset=True)
+
+    positions = np.arange(self._size)
+    for n in self.ma_windows:
+      self._set(_get_ma_colname(n), self._calc_ma(n, positions))
+
+    closes_series = pd.Series(closes)
+    self._set('high_52', closes_series.rolling(extreme_window, min_periods=1).max().values)
+    self._set('low_52', closes_series.rolling(extreme_window, min_periods=1).min().values)
+
+    sigmas = self._calc_sigma(positions)
+    self._set('sigma', sigmas)
+    with np.errstate(divide='ignore', invalid='ignore'):
+      self._set('zscore', changes / np.concatenate([[np.nan], sigmas[:-1]]))
+
+    self._highs = deque()
+    self._lows = deque()
+    for i in range(max(0, self._size - extreme_window), self._size):
+      self._push_extremes(i, closes[i])
+
+  def _set(self, colname, values, offset=False):
+    capacity = max(self._INITIAL_CAPACITY, 2 * self._size + 1)
+    column = np.full(capacity, np.nan) if values.dtype.kind == 'f' else np.zeros(capacity, dtype=values.dtype)
+    if offset:
+      column[0] = 0
+      column[1:len(values) + 1] = values
+    else:
+      column[:len(values)] = values
+    self._columns[colname] = column
+
+  def _grow(self):
+    for colname, column in self._columns.items():
+      grown = np.full(2 * len(column), np.nan) if column.dtype.kind == 'f' else np.zeros(2 * len(column), dtype=column.dtype)
+      grown[:len(column)] = column
+      self._columns[colname] = grown
+
+  def _calc_ma(self, n, positions):
+    cumsum = self._columns['cumsum_close']
+    starts = np.maximum(positions + 1 - n, 0)
+    return (cumsum[positions + 1] - cumsum[starts]) / (positions + 1 - starts)
+
+  def _calc_sigma(self, positions):
+    starts = np.maximum(positions + 1 - self.sigma_window, 0)
+    ends = positions + 1
+    counts = self._columns['cumsum_count'][ends] - self._columns['cumsum_count'][starts]
+    sums = self._columns['cumsum_change'][ends] - self._columns['cumsum_change'][starts]
+    sums_sq = self._columns['cumsum_change_sq'][ends] - self._columns['cumsum_change_sq'][starts]
+    with np.errstate(divide='ignore', invalid='ignore'):
+      variances = np.maximum(sums_sq - sums**2 / counts, 0) / (counts - 1)
+    return np.where(counts > 1, np.sqrt(variances), np.nan)
+
+  def _push_extremes(self, i, close):
+    while self._highs and self._highs[0] <= i - self.extreme_window:
+      self._highs.popleft()
+    while self._lows and self._lows[0] <= i - self.extreme_window:
+      self._lows.popleft()
+
+    closes = self._columns['close']
+    while self._highs and closes[self._highs[-1]] <= close:
+      self._highs.pop()
+    while self._lows and closes[self._lows[-1]] >= close:
+      self._lows.pop()
+    self._highs.append(i)
+    self._lows.append(i)
+
+  def __len__(self):
+    return self._size
+
+  def append(self, date, close):
+    """
+    Add the next bar and its indicators.
+    """
+    i = self._size
+    if i + 2 > len(self._columns['close']):
+      self._grow()
+    columns = self._columns
+
+    change = np.log(close / columns['close'][i - 1]) if i else np.nan
+    is_change = np.isfinite(change)
+    change_or_zero = change if is_change else 0
+
+    columns['date'][i] = np.datetime64(pd.Timestamp(date), 'ns')
+    columns['close'][i] = close
+    columns['change'][i] = change
+    columns['cumsum_close'][i + 1] = columns['cumsum_close'][i] + close
+    columns['cumsum_count'][i + 1] = columns['cumsum_count'][i] + is_change
+    columns['cumsum_change'][i + 1] = columns['cumsum_change'][i] + change_or_zero
+    columns['cumsum_change_sq'][i + 1] = columns['cumsum_change_sq'][i] + change_or_zero**2
+    self._size += 1
+
+    positions = np.array([i])
+    for n in self.ma_windows:
+      columns[_get_ma_colname(n)][i] = self._calc_ma(n, positions)[0]
+
+    self._push_extremes(i, close)
+    columns['high_52'][i] = columns['close'][self._highs[0]]
+    columns['low_52'][i] = columns['close'][self._lows[0]]
+
+    columns['sigma'][i] = self._calc_sigma(positions)[0]
+    with np.errstate(divide='ignore', invalid='ignore'):
+      columns['zscore'][i] = change / columns['sigma'][i - 1] if i else np.nan
+
+  def _get_position(self, index):
+    position = index + self._size if index < 0 else index
+    if not 0 <= position < self._size:
+      raise IndexError(f"Indicator index {index} out of range for {self._size} bars")
+    return position
+
+  def get(self, colname, index=-1):
+    return self._columns[colname][self._get_position(index)]
+
+  def get_values(self, colname):
+    # View of the column, valid until the next append.
+    return self._columns[colname][:self._size]
+
+  def get_index(self, date):
+    """
+    Index of the last bar on or before date. Raises KeyError if date is before the first bar.
+    """
+    dates = self.get_values('date')
+    index = int(np.searchsorted(dates, np.datetime64(pd.Timestamp(date), 'ns'), side='right')) - 1
+    if index < 0:
+      # -1 would otherwise read as the latest bar.
+      raise KeyError(f"No bar on or before {date}")
+    return index
+
+  def get_ma(self, n, index=-1):
+    colname = _get_ma_colname(n)
+    if colname in self._columns:
+      return self.get(colname, index=index)
+    return self._calc_ma(n, np.array([self._get_position(index)]))[0]
+
+  def get_52_high(self, index=-1):
+    return self.get('high_52', index=index)
+
+  def get_52_low(self, index=-1):
+    return self.get('low_52', index=index)
+
+  def get_sigma(self, index=-1):
+    return self.get('sigma', index=index)
+
+  def get_zscore(self, index=-1):
+    return self.get('zscore', index=index)
+
+  def to_df(self):
+    colnames = ['date', 'close', 'change'] + [_get_ma_colname(n) for n in self.ma_windows] + ['high_52', 'low_52', 'sigma', 'zscore']
+    return pd.DataFrame({colname: self.get_values(colname) for colname in colnames})
@@ -1,5 +1,4 @@
 import math
-import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
 import sys
@@ -8,13 +7,16 @@ import config
 
 from datetime import timedelta
 
+from analysis.indicators import IndicatorPanel
+from instrumentation import timed
+from storage.prices import load_historical_prices
 from vendors.tradier import (
-  fetch_historical_prices,
   fetch_past_earnings_dates,
   fetch_next_earnings_date,
   fetch_latest_price,
 )
 
+from quotes import get_quote_snapshot
 from constants import (
   DATE_FORMAT,
   MU,
@@ -32,6 +34,16 @@ from utils import (
 )
 
 
+def expand_segments(starts, ends):
+  """
+  Concatenated np.arange(start, end) of every segment, plus the segment id of each position.
+  """
+  lengths = np.maximum(ends - starts, 0)
+  segment_ids = np.repeat(np.arange(len(lengths)), lengths)
+  positions = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths) + np.repeat(starts, lengths)
+  return positions, segment_ids
+
+
 class PriceModel:
   
   _COLNAME_DAILY_CHANGE = 'daily_change'
@@ -41,20 +53,18 @@ class PriceModel:
   _COLNAME_DATE = 'date'
   _COLNAME_PREV_DAY = 'previous_trading_date'
 
+  @timed('price_model')
   def __init__(self, symbol, start_date=None, avoid_earnings=config.SHOULD_AVOID_EARNINGS):
     self.symbol = symbol
 
-    if start_date is None:
-      self.start_date = config.TICKER_REGIME_START_DATE.get(self.symbol) or config.REGIME_START_DATE_DEFAULT
-    else:
-      self.start_date = start_date
+    self.start_date = self.get_start_date(symbol, start_date=start_date)
 
     # Sorted in most recent first.
     self.past_earnings_dates = fetch_past_earnings_dates(symbol, after=self.start_date)
     self.next_earnings_date = fetch_next_earnings_date(symbol, after=self.start_date)
 
     # Some helper columns.
-    self.prices_df = pd.DataFrame(fetch_historical_prices(symbol, self.start_date))
+    self.prices_df = load_historical_prices(symbol, self.start_date)
     self.prices_df[self._COLNAME_DATE] = pd.to_datetime(self.prices_df[self._COLNAME_DATE])
     self.prices_df[self._COLNAME_PREV_DAY] = pd.to_datetime(self.prices_df[self._COLNAME_DATE].shift(1))
     self.prices_df[self._COLNAME_DAILY_CHANGE] = self.calc_marginal_change(self.prices_df)
@@ -73,11 +83,33 @@ class PriceModel:
     if self.prices_df.iloc[-1]['date'] == pd.Timestamp(config.NOW.date()):
       self.prices_df = self.prices_df.drop(self.prices_df.index[-1])
 
+    self.indicators = IndicatorPanel(self.prices_df[self._COLNAME_DATE].values, self.prices_df[self._COLNAME_CLOSE].values)
+
+  @staticmethod
+  def get_start_date(symbol, start_date=None):
+    if start_date is None:
+      return config.TICKER_REGIME_START_DATE.get(symbol) or config.REGIME_START_DATE_DEFAULT
+    return start_date
+
+  @classmethod
+  def prefetch(cls, symbol, start_date=None):
+    """
+    Fetch what __init__ needs into the shared cache without computing anything.
+    """
+    start_date = cls.get_start_date(symbol, start_date=start_date)
+    fetch_past_earnings_dates(symbol, after=start_date)
+    fetch_next_earnings_date(symbol, after=start_date)
+    load_historical_prices(symbol, start_date)
+
   def get_next_earnings_date(self):
     return self.next_earnings_date
   
   def get_latest_price(self):
-    return fetch_latest_price(self.symbol)
+    # Prefer the quote shared by the current run, if any.
+    latest_price = get_quote_snapshot().get(self.symbol)
+    if latest_price is None:
+      latest_price = fetch_latest_price(self.symbol)
+    return latest_price
 
   def get_latest_change(self):
     last_row = self.prices_df.iloc[-1]
@@ -118,6 +150,7 @@ class PriceModel:
     return np.log(df[colname]/df[colname].shift(periods))
 
   def graph_historical_returns(self, periods):
+    import matplotlib.pyplot as plt
     graph_df = self.prices_df[self.avoid_earnings_mask]
     
     graph_df['returns'] = self.calc_marginal_change(graph_df, periods=periods)
@@ -135,19 +168,41 @@ class PriceModel:
     plt.tight_layout()
     plt.show()
 
-  def graph_intraquarter_returns(self, periods, fig_num=2):
-    assert periods < 60
-    graph_df = self.prices_df[self.avoid_earnings_mask]
+  def get_quarter_segments(self, df):
+    """
+    Segment index of df rows per quarter between consecutive past earnings dates
+    (both dates inclusive), most recent quarter first. Quarter i is df.iloc[starts[i]:ends[i]].
+    """
+    dates = df[self._COLNAME_DATE].values
+    earnings_dates = pd.DatetimeIndex(self.past_earnings_dates)
+    if earnings_dates.tz is not None:
+      earnings_dates = earnings_dates.tz_localize(None)
+    earnings_dates = earnings_dates.values
+
+    this_earnings_dates = earnings_dates[:-1]
+    starts = np.searchsorted(dates, earnings_dates[1:], side='left')
+    ends = np.searchsorted(dates, this_earnings_dates, side='right')
+    return starts, ends, this_earnings_dates
+
+  def calc_intraquarter_returns(self, periods_list):
+    """
+    Returns within each quarter (never across earnings) for every periods in periods_list.
+    """
+    df = self.prices_df[self.avoid_earnings_mask]
+    closes = df[self._COLNAME_CLOSE].values
+    starts, ends, _ = self.get_quarter_segments(df)
 
-    returns = []
+    returns = dict()
+    for periods in periods_list:
+      positions, _ = expand_segments(starts + periods, ends)
+      returns[periods] = np.log(closes[positions] / closes[positions - periods])
+    return returns
 
-    for i, this_earnings_date in enumerate(self.past_earnings_dates[:-1]):
-      prev_earnings_date = self.past_earnings_dates[i + 1]
+  def graph_intraquarter_returns(self, periods, fig_num=2):
+    import matplotlib.pyplot as plt
+    assert periods < 60
 
-      mask = graph_df['date'].between(prev_earnings_date, this_earnings_date)
-      quarter_df = graph_df[mask]
-      period_returns = self.calc_marginal_change(quarter_df, periods=periods).dropna()
-      returns = np.concatenate([returns, period_returns])
+    returns = self.calc_intraquarter_returns([periods])[periods]
 
     print(f"Period={periods}: mean={returns.mean()} sigma={returns.std()}")
 
@@ -161,52 +216,63 @@ class PriceModel:
     plt.hist(returns, bins=x)
     plt.legend(title=f"Periods={periods}")
 
-  def calc_intraquarter_predict_price_accuracy(self, days, tscore, is_under=True):
-    assert days < 60
-    
+  def calc_intraquarter_predict_price_accuracies(self, days_list, tscores, is_under=True):
+    """
+    Fraction of predicted prices (days ahead, within the same quarter) under (or over) the actual close, per days in days_list.
+    """
+    assert max(days_list) < 60
+
     df = self.prices_df[self.avoid_earnings_mask]
+    dates = df[self._COLNAME_DATE].values
+    closes = df[self._COLNAME_CLOSE].values
+    starts, ends, this_earnings_dates = self.get_quarter_segments(df)
+    positions, quarter_ids = expand_segments(starts, ends)
+
+    accuracies = []
+    for days, tscore in zip(days_list, tscores):
+      # Trading days to calendar days.
+      predict_on = dates[positions] + np.timedelta64(timedelta(days=days*7/5))
+      predict_on_dates = predict_on.astype('datetime64[D]').astype(dates.dtype)
 
-    num_over = 0
-    num_under = 0
-    for i, this_earnings_date in enumerate(self.past_earnings_dates[:-1]):
-      prev_earnings_date = self.past_earnings_dates[i + 1]
+      # Only compare predictions landing on a trading day before next earnings.
+      actual_positions = np.minimum(np.searchsorted(dates, predict_on_dates), len(dates) - 1)
+      mask = (predict_on < this_earnings_dates[quarter_ids]) & (dates[actual_positions] == predict_on_dates)
 
-      quarter_mask = df['date'].between(prev_earnings_date, this_earnings_date)
-      mask = quarter_mask & (df['date'] + timedelta(days=days*7/5) < this_earnings_date)
-      quarter_df = df[mask]
+      predicted = self.predict_price(days, tscore, closes[positions[mask]])
+      actual = closes[actual_positions[mask]]
 
-      pred_df = pd.DataFrame()
-      pred_df['date'] = (quarter_df['date'] + timedelta(days=days*7/5)).dt.date
-      # Axis=1 to apply to each row.
-      pred_df['predicted'] = quarter_df.apply(lambda row: self.predict_price(days, tscore, row['close']), axis=1)
-      
-      compare_df = df[quarter_mask].set_index('date').join(pred_df.set_index('date'))
+      num_over = np.sum(predicted < actual)
+      num_under = np.sum(predicted >= actual)
+      total = num_over + num_under
+      accuracies.append(num_under / total if is_under else num_over / total)
 
-      num_over += sum(compare_df['predicted'] < compare_df['close'])
-      num_under += sum(compare_df['predicted'] >= compare_df['close'])
+    return accuracies
 
-    total = num_over + num_under
-    return num_under / total if is_under else num_over / total
+  def calc_intraquarter_predict_price_accuracy(self, days, tscore, is_under=True):
+    return self.calc_intraquarter_predict_price_accuracies([days], [tscore], is_under=is_under)[0]
 
-  def get_ma(self, n=200):
-    return self.prices_df.iloc[-1*n:]['close'].mean().round(2)
+  def get_ma(self, n=200, index=-1):
+    return self.indicators.get_ma(n, index=index).round(2)
 
-  def get_52_high(self):
-    return self.prices_df.iloc[-252:]['close'].max().round(2)
+  def get_52_high(self, index=-1):
+    return self.indicators.get_52_high(index=index).round(2)
 
-  def get_52_low(self):
-    return self.prices_df.iloc[-252:]['close'].min().round(2)
+  def get_52_low(self, index=-1):
+    return self.indicators.get_52_low(index=index).round(2)
 
 
 if __name__ == '__main__':
+  import matplotlib.pyplot as plt
 
   model = PriceModel('NVDA')
   sig_level = 0.9
 
-  for i, dte in enumerate([10, 20, 30, 40]):
+  dtes = [10, 20, 30, 40]
+  for i, dte in enumerate(dtes):
     model.graph_intraquarter_returns(dte, fig_num=i + 1)
-    tscore = get_tscore(sig_level, dte - 1)
-    print(model.calc_intraquarter_predict_price_accuracy(dte, tscore))
+
+  tscores = [get_tscore(sig_level, dte - 1) for dte in dtes]
+  print(model.calc_intraquarter_predict_price_accuracies(dtes, tscores))
 
   print('Rendering plot in Output tab...')
   plt.tight_layout()
@@ -1,59 +1,179 @@
 import argparse
+import numpy as np
 import pandas as pd
 
-from analysis.models import PriceModel
-from constants import T_SIG_LEVELS 
-from utils import get_tscore
-from vendors.tradier import fetch_historical_prices
+import config
+
+from concurrent.futures import ProcessPoolExecutor
+from datetime import timedelta
+
+from constants import T_SIG_LEVELS
+from storage.prices import load_historical_prices
+from utils import calc_target_price, get_xscores
+from vendors.tradier import fetch_past_earnings_dates
+
+
+REGIME_COLUMNS = ['start_date', 'dte', 'siglevel', 'itm_proba', 'diff']
+
+DTES = list(range(5, 21))
+SIG_LEVELS = T_SIG_LEVELS[3:12]
+
+
+def make_start_dates(since, until=None, freq='W-MON'):
+  """
+  Candidate regime start dates on a regular grid, as date strings.
+  """
+  until = until or (config.NOW - timedelta(days=180)).strftime('%Y-%m-%d')
+  return [x.strftime('%Y-%m-%d') for x in pd.date_range(since, until, freq=freq)]
+
+
+def calc_regime_stats(dates, daily_changes, is_on_earnings, is_after_earnings, start_dates, avoid_earnings=config.SHOULD_AVOID_EARNINGS):
+  """
+  Daily mean and stdev of changes from each start date onwards, as PriceModel(start_date=...) computes them,
+  from suffix sums over a single history.
+  """
+  start_positions = np.searchsorted(dates, start_dates.astype(dates.dtype), side='left')
+
+  mask = np.isfinite(daily_changes)
+  if avoid_earnings:
+    mask &= ~(is_on_earnings | is_after_earnings)
+
+  # Center to limit cancellation in the variance.
+  center = daily_changes[mask].mean()
+  x = np.where(mask, daily_changes - center, 0)
+
+  def suffix_sum(values):
+    return np.concatenate([np.cumsum(values[::-1])[::-1], [0]])
+
+  counts = suffix_sum(mask.astype(float))
+  sums = suffix_sum(x)
+  sums_sq = suffix_sum(x**2)
+
+  # First change of each regime is undefined.
+  first = np.minimum(start_positions + 1, len(dates))
+  n = counts[first]
+  s1 = sums[first]
+  s2 = sums_sq[first]
+
+  if avoid_earnings:
+    # An earnings date on the start date itself is excluded from that regime's
+    # earnings dates so the day after it is not treated as an earnings move.
+    is_fixed = (first < len(dates)) & (dates[start_positions.clip(max=len(dates) - 1)] == start_dates) \
+      & is_on_earnings[start_positions.clip(max=len(dates) - 1)]
+    fixed = first.clip(max=len(dates) - 1)
+    is_fixed &= np.isfinite(daily_changes[fixed]) & is_after_earnings[fixed] & ~is_on_earnings[fixed]
+    n = n + is_fixed
+    s1 = s1 + np.where(is_fixed, daily_changes[fixed] - center, 0)
+    s2 = s2 + np.where(is_fixed, (daily_changes[fixed] - center)**2, 0)
+
+  with np.errstate(invalid='ignore', divide='ignore'):
+    means = s1 / n + center
+    stdevs = np.sqrt(np.maximum(s2 - s1**2 / n, 0) / (n - 1))
+  return start_positions, means, stdevs
+
+
+def calc_regime_df(symbol, start_dates, dtes=DTES, sig_levels=SIG_LEVELS):
+  """
+  Fraction of closes dte days later at or under the sig_level target, for every
+  (start date x dte x sig level) from one load of the longest history.
+  """
+  start_dates = sorted(start_dates)
+  earliest = start_dates[0]
+
+  prices_df = load_historical_prices(symbol, earliest)
+  past_earnings_dates = fetch_past_earnings_dates(symbol, after=earliest)
+
+  date_series = pd.to_datetime(prices_df['date'])
+  closes = prices_df['close'].values.astype(float)
+  dates = date_series.values
+  daily_changes = np.log(closes[1:] / closes[:-1])
+  daily_changes = np.concatenate([[np.nan], daily_changes])
+  is_on_earnings = date_series.isin(past_earnings_dates).values
+  is_after_earnings = date_series.shift(1).isin(past_earnings_dates).values
+
+  start_positions, means, stdevs = calc_regime_stats(
+    dates,
+    daily_changes,
+    is_on_earnings,
+    is_after_earnings,
+    pd.to_datetime(start_dates).values,
+  )
+
+  # Like PriceModel, stats include today but predictions start from the previous trading day.
+  num_rows = len(dates)
+  if num_rows and dates[-1] == np.datetime64(config.NOW.date()):
+    num_rows -= 1
+  closes = closes[:num_rows]
+  num_regime_rows = num_rows - start_positions
+
+  positions = np.arange(num_rows)
+  tscores = get_xscores(sig_levels, dtes)  # (sig levels x dtes)
+  probas = np.empty((len(start_dates), len(dtes), len(sig_levels)))
+
+  for j, dte in enumerate(dtes):
+    from_prices = closes[:num_rows - dte]
+    actuals = closes[dte:]
+
+    # (start dates x sig levels x rows)
+    targets = calc_target_price(
+      from_prices[None, None, :],
+      means[:, None, None],
+      stdevs[:, None, None],
+      dte,
+      tscores[None, :, j, None],
+    )
+    is_itm = (actuals <= targets) & (positions[:num_rows - dte] >= start_positions[:, None, None])
+    probas[:, j, :] = is_itm.sum(axis=2) / num_regime_rows[:, None]
+
+  num_dtes, num_sig_levels = len(dtes), len(sig_levels)
+  regime_df = pd.DataFrame(dict(
+    start_date=np.repeat(start_dates, num_dtes * num_sig_levels),
+    dte=np.tile(np.repeat(dtes, num_sig_levels), len(start_dates)),
+    siglevel=np.tile(sig_levels, len(start_dates) * num_dtes),
+    itm_proba=probas.ravel(),
+  ))
+  regime_df['diff'] = regime_df['itm_proba'] - regime_df['siglevel']
+  return regime_df[REGIME_COLUMNS]
+
+
+def calc_regime_errors(regime_df):
+  """
+  Sum of squared calibration errors per start date.
+  """
+  return (regime_df['diff']**2).groupby(regime_df['start_date']).sum()
 
 
 def find_best_regime_start_date(symbol, start_dates):
-  
-  for start_date in start_dates:
-    
-    model = PriceModel(symbol, start_date=start_date)
-    regime_df = pd.DataFrame(columns=['start_date', 'dte', 'siglevel', 'itm_proba', 'diff'])
-  
-    for dte in range(5, 21):
-      df = pd.DataFrame()
+  errors = calc_regime_errors(calc_regime_df(symbol, start_dates))
+  for start_date, error in errors.items():
+    print('[{}]'.format(symbol), start_date, 'error squared:', error)
 
-      for sig_level in T_SIG_LEVELS[3:12]:
+  best_start_date = errors.idxmin()
+  print('[{}]'.format(symbol), 'best start date:', best_start_date)
+  print()
+  return best_start_date
 
-        target_colname = '[{}]{}_dte_{}_target'.format(start_date, dte, sig_level)
 
-        tscore = get_tscore(sig_level, dte)
-        df[target_colname] = model.prices_df.apply(lambda row: model.predict_price(dte, tscore, row['close']), axis=1)
-
-        actual_colname = '[{}]{}_dte_{}_actual'.format(start_date, dte, sig_level)
-        df[actual_colname] = model.prices_df['close'].shift(-1 * dte)
-
-        itm_colname = '[{}]{}_dte_{}_is_itm_put'.format(start_date, dte, sig_level)
-
-        df[itm_colname] = df[actual_colname] <= df[target_colname]
-  
-        proba = len(df[df[itm_colname] == True]) / len(df.index)
-        diff = proba - sig_level
-
-        regime_df.loc[len(regime_df.index)] = [start_date, dte, sig_level, proba, diff]
-
-    print('[{}]'.format(symbol), start_date, 'error squared:', ((regime_df['itm_proba'] - regime_df['siglevel'])**2).sum())
-    print()
+def find_best_regime_start_dates(symbols, start_dates, max_workers=config.NUM_PARALLEL_JOBS):
+  """
+  Best start date per symbol, one symbol per process.
+  """
+  with ProcessPoolExecutor(max_workers=max_workers) as executor:
+    best_start_dates = executor.map(find_best_regime_start_date, symbols, [start_dates] * len(symbols))
+    return dict(zip(symbols, best_start_dates))
 
 
 if __name__ == '__main__':
   parser = argparse.ArgumentParser()
   parser.add_argument('-t', '--tickers', required=True)
+  parser.add_argument('--since', default=config.REGIME_START_DATE_DEFAULT, help='first candidate start date')
+  parser.add_argument('--until', default=None, help='last candidate start date (default 180 days ago)')
+  parser.add_argument('--freq', default='W-MON', help='pandas frequency of candidate start dates')
 
   args = parser.parse_args()
   tickers = args.tickers.upper().split(',')
 
-  start_dates = [
-    '2022-01-01',  # includes bear market
-    '2023-01-01',  # FED signals rate cut
-    '2024-01-01',
-  ]
-
-  for ticker in tickers:
-    find_best_regime_start_date(ticker, start_dates)
-
+  start_dates = make_start_dates(args.since, until=args.until, freq=args.freq)
 
+  for ticker, start_date in find_best_regime_start_dates(tickers, start_dates).items():
+    print(ticker, start_date)
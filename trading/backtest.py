@@ -1,52 +1,205 @@
+import argparse
 import numpy as np
 import os
 import pickle
 import pandas as pd
-import vectorbt as vbt
 
+import config
+
+from analysis.models import PriceModel
+from constants import WATCHLIST
 from decorators import cached
-from utils import (
-  calc_expected_price,
-)
+from storage.prices import load_historical_prices
+from utils import calc_target_price
 from vendors.tradier import fetch_past_earnings_dates
 
 
-def calc_historical_itm_proba(symbol, prices, mu, sigma, trading_days, zscore, contract_type='c'):
-  earnings_dates = fetch_past_earnings_dates(symbol)
+CONTRACT_TYPES = ['c', 'p']
+
+BACKTEST_DTES = [5, 10, 20, 30, 40]
+BACKTEST_ZSCORES = [-2, -1.5, -1, -0.5, 0, 0.5, 1, 1.5, 2]
+
+# Day offsets between symbols in keys of (symbol, date).
+_DAYS_PER_SYMBOL = 1_000_000
+
+
+def calc_earnings_overlaps(dates, expiry_dates, earnings_dates):
+  """
+  True where an earnings date falls on or between date and expiry date, since
+  like PriceModel both the earnings date and the day after move on earnings.
+  """
+  earnings_dates = np.sort(earnings_dates)
+  return np.searchsorted(earnings_dates, expiry_dates, side='right') > np.searchsorted(earnings_dates, dates, side='left')
+
+
+def to_naive_dates(dates):
+  dates = pd.DatetimeIndex(pd.to_datetime(dates))
+  if dates.tz is not None:
+    dates = dates.tz_localize(None)
+  return dates.values
+
 
-  df = pd.DataFrame(prices)
-  df['date'] = df['date']
-  # Add column of expected price in n days.
-  df['expected_price'] = df.apply(lambda x: calc_expected_price(x['close'], mu, sigma, 1, zscore), axis=1)
+def make_symbol_date_keys(codes, dates):
+  # Sorts by symbol then day so one searchsorted serves every symbol.
+  return np.asarray(codes, dtype=np.int64) * _DAYS_PER_SYMBOL + dates.astype('datetime64[D]').astype(np.int64)
 
-  # If start days is before earnings and n days later is after earnings, use None.
-  df['expected_expiry'] = pd.to_datetime(df['date']) + pd.Timedelta(trading_days, unit='d')
 
-  for earnings_date in earnings_dates:
-    df.loc[(df['date'] < earnings_date) & (df['expected_expiry'] > earnings_date), 'expected_price'] = None
+def calc_panel_itm_probas(panel_df, earnings_df, dtes, zscores):
+  """
+  ITM proba of every (symbol, dte, zscore, contract type) over all price rows whose
+  holding period does not span earnings, in one array pass over the stacked symbols.
+  panel_df := rows of "symbol", "date", "close", "mu" and "sigma", contiguous by symbol.
+  earnings_df := rows of "symbol" and "date".
+  Targets are dte trading days out and the holding period ends dte rows later.
+  """
+  codes, symbols = pd.factorize(panel_df['symbol'])
+  dates = to_naive_dates(panel_df['date'])
+  closes = panel_df['close'].values.astype(float)
+  mus = panel_df['mu'].values.astype(float)
+  sigmas = panel_df['sigma'].values.astype(float)
+  num_rows = len(closes)
 
-  # Add column of boolean if actual price < expeected price column (for cc).
-  df['actual_price'] = df['close'].shift(-1*trading_days)
+  # Rows of a symbol are contiguous so each row's holding period must end before the next symbol's first row.
+  starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+  ends = np.r_[starts[1:], num_rows]
+  row_ends = ends[np.repeat(np.arange(len(starts)), np.diff(np.r_[starts, num_rows]))]
 
-  if contract_type == 'c':
-    df['is_itm'] = df['actual_price'] >= df['expected_price']
-  elif contract_type == 'p':
-    df['is_itm'] = df['actual_price'] <= df['expected_price']
+  earnings_codes = pd.Categorical(earnings_df['symbol'], categories=symbols).codes
+  earnings_keys = make_symbol_date_keys(earnings_codes, to_naive_dates(earnings_df['date']))[earnings_codes >= 0]
 
-  # Tally count of True values divide by total count.
-  proba = len(df[df['is_itm'] == True])/len(df['expected_price'].dropna())
+  dtes = np.asarray(dtes)
+  zscores = np.asarray(zscores, dtype=float)
 
-  return proba
+  # (dtes x rows) of the close dte trading days later, if any.
+  positions = np.arange(num_rows)
+  actual_positions = positions[None, :] + dtes[:, None]
+  has_actual = actual_positions < row_ends[None, :]
+  actual_positions = np.minimum(actual_positions, num_rows - 1)
+  actuals = closes[actual_positions]
 
+  is_valid = has_actual & ~calc_earnings_overlaps(
+    make_symbol_date_keys(codes, dates)[None, :],
+    make_symbol_date_keys(codes, dates[actual_positions]),
+    earnings_keys,
+  )
+  # (dtes x symbols)
+  num_samples = np.add.reduceat(is_valid, starts, axis=1)
+
+  # (dtes x zscores x rows)
+  expected = calc_target_price(closes[None, None, :], mus, sigmas, dtes[:, None, None], zscores[None, :, None])
+  is_valid = is_valid[:, None, :]
+
+  # (contract types x dtes x zscores x symbols)
+  num_itms = np.stack([
+    np.add.reduceat((actuals[:, None, :] >= expected) & is_valid, starts, axis=2),
+    np.add.reduceat((actuals[:, None, :] <= expected) & is_valid, starts, axis=2),
+  ])
+  with np.errstate(invalid='ignore', divide='ignore'):
+    itm_probas = num_itms / num_samples[None, :, None, :]
+
+  num_symbols, num_types, num_dtes, num_zscores = len(symbols), len(CONTRACT_TYPES), len(dtes), len(zscores)
+  return pd.DataFrame(dict(
+    symbol=np.repeat(symbols, num_types * num_dtes * num_zscores),
+    dte=np.tile(np.repeat(dtes, num_zscores), num_symbols * num_types),
+    zscore=np.tile(zscores, num_symbols * num_types * num_dtes),
+    contract_type=np.tile(np.repeat(CONTRACT_TYPES, num_dtes * num_zscores), num_symbols),
+    itm_proba=itm_probas.transpose(3, 0, 1, 2).ravel(),
+    num_samples=np.broadcast_to(num_samples.T[:, None, :, None], (num_symbols, num_types, num_dtes, num_zscores)).ravel(),
+  ))
+
+
+def calc_historical_itm_probas(prices, earnings_dates, mu, sigma, dtes, zscores):
+  """
+  ITM proba of every (dte, zscore, contract type) of one symbol, see calc_panel_itm_probas.
+  """
+  panel_df = pd.DataFrame(prices).assign(symbol='', mu=mu, sigma=sigma)
+  earnings_df = pd.DataFrame(dict(symbol='', date=list(earnings_dates)))
+  return calc_panel_itm_probas(panel_df, earnings_df, dtes, zscores).drop(columns='symbol')
+
+
+def calc_historical_itm_proba(symbol, prices, mu, sigma, trading_days, zscore, contract_type='c'):
+  earnings_dates = fetch_past_earnings_dates(symbol)
+  df = calc_historical_itm_probas(prices, earnings_dates, mu, sigma, [trading_days], [zscore])
+  return df[df['contract_type'] == contract_type]['itm_proba'].iloc[0]
+
+
+def load_backtest_panel(symbols):
+  """
+  Daily closes of all symbols stacked over each symbol's regime, and their past earnings dates.
+  """
+  prices_dfs = []
+  earnings_dfs = []
+  for symbol in symbols:
+    start_date = PriceModel.get_start_date(symbol)
+    prices_df = pd.DataFrame(load_historical_prices(symbol, start_date))
+    prices_dfs.append(prices_df[['date', 'close']].assign(symbol=symbol))
+    earnings_dates = to_naive_dates(fetch_past_earnings_dates(symbol, after=start_date))
+    earnings_dfs.append(pd.DataFrame(dict(symbol=symbol, date=earnings_dates)))
+
+  return pd.concat(prices_dfs, ignore_index=True), pd.concat(earnings_dfs, ignore_index=True)
+
+
+def calc_regime_stats(panel_df, earnings_df, avoid_earnings=config.SHOULD_AVOID_EARNINGS):
+  """
+  Daily mean and stdev of log returns per symbol as in PriceModel, for all symbols at once.
+  """
+  codes, symbols = pd.factorize(panel_df['symbol'])
+  dates = to_naive_dates(panel_df['date'])
+  closes = panel_df['close'].values.astype(float)
+
+  is_first = np.r_[True, codes[1:] != codes[:-1]]
+  changes = np.where(is_first, np.nan, np.log(closes / np.roll(closes, 1)))
+
+  df = pd.DataFrame(dict(symbol=panel_df['symbol'].values, change=changes))
+  if avoid_earnings:
+    # Earnings move both the earnings date and the day after.
+    earnings_codes = pd.Categorical(earnings_df['symbol'], categories=symbols).codes
+    earnings_keys = make_symbol_date_keys(earnings_codes, to_naive_dates(earnings_df['date']))[earnings_codes >= 0]
+    keys = make_symbol_date_keys(codes, dates)
+    is_earnings = np.isin(keys, earnings_keys) | (~is_first & np.isin(np.roll(keys, 1), earnings_keys))
+    df = df[~is_earnings]
+
+  return df.groupby('symbol', sort=False)['change'].agg(mu='mean', sigma='std')
+
+
+def backtest_itm_probas(symbols, dtes=BACKTEST_DTES, zscores=BACKTEST_ZSCORES):
+  """
+  Calibration of predicted vs historical ITM probas per symbol, using each symbol's regime.
+  """
+  panel_df, earnings_df = load_backtest_panel(symbols)
+  panel_df = panel_df.join(calc_regime_stats(panel_df, earnings_df), on='symbol')
+  # Like PriceModel, stats include a bar of today but it is not a close to backtest from.
+  panel_df = panel_df[to_naive_dates(panel_df['date']) < np.datetime64(config.NOW.date())]
+  df = calc_panel_itm_probas(panel_df, earnings_df, dtes, zscores)
+
+  from scipy import stats
+
+  # Calls expire ITM above the target, puts below.
+  under_probas = stats.norm.cdf(df['zscore'])
+  df['expected_proba'] = np.where(df['contract_type'] == 'c', 1 - under_probas, under_probas)
+  df['diff'] = df['itm_proba'] - df['expected_proba']
+  return df
+
+
+def calc_calibration_table(backtest_df):
+  """
+  Sample weighted ITM probas across symbols, one row per (contract type, dte) and column per zscore.
+  """
+  df = backtest_df.assign(num_itm=backtest_df['itm_proba'].fillna(0) * backtest_df['num_samples'])
+  df = df.groupby(['contract_type', 'dte', 'zscore'])[['num_itm', 'num_samples']].sum()
+  itm_probas = df['num_itm'] / df['num_samples']
+  return itm_probas.unstack('zscore').round(3)
 
 
 @cached()
 def fetch_prices(symbols):
+  import vectorbt as vbt
   df = vbt.YFData.download(symbols, missing_index='drop').get('Close')
   return df
 
 
 def buy_mag7_strategy():
+  import vectorbt as vbt
 
   # Fetch historical stock price data
   symbols = ['AAPL', 'AMZN', 'META', 'GOOG', 'MSFT', 'NVDA', 'NFLX', 'TSLA']
@@ -86,5 +239,13 @@ def buy_mag7_strategy():
 
 
 if __name__ == '__main__':
-#  buy_mag7_strategy()
-  fetch_prices('NVDA') 
+  parser = argparse.ArgumentParser()
+  parser.add_argument('-t', '--tickers')
+
+  args = parser.parse_args()
+  tickers = args.tickers.upper().split(',') if args.tickers else WATCHLIST.keys()
+
+  backtest_df = backtest_itm_probas(tickers)
+  print(backtest_df.to_string())
+  print()
+  print(calc_calibration_table(backtest_df).to_string())
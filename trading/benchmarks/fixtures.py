@@ -0,0 +1,81 @@
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+import config
+
+from cache import PickleDirCache
+from constants import DATE_FORMAT
+from storage.chains import get_chain_columns
+
+
+DATESTR_PATTERN = re.compile(r'\d{4}-\d{2}-\d{2}')
+
+
+def _get_template_keys(fixture_dir, datestr, template):
+  pattern = re.compile(rf'[-_]{template}([-_]|$)')
+  return [
+    f"{datestr}/{filename[:-4]}"
+    for filename in os.listdir(os.path.join(fixture_dir, datestr))
+    if filename.endswith('.pkl') and pattern.search(filename[:-4])
+  ]
+
+
+def make_expiry_datestrs(template_datestrs, num_expirations):
+  """
+  First num_expirations template expiries, extended monthly past the last one if needed.
+  """
+  datestrs = list(template_datestrs[:num_expirations])
+  last = pd.Timestamp(template_datestrs[-1])
+  while len(datestrs) < num_expirations:
+    last = last + pd.offsets.WeekOfMonth(week=2, weekday=4)  # 3rd Friday
+    datestrs.append(last.strftime(DATE_FORMAT))
+  return datestrs
+
+
+def make_synthetic_fixtures(cache_dir, num_symbols, num_expirations, template='MDB', fixture_dir=config.CACHE_DIR):
+  """
+  Clone the template symbol's saved responses into cache_dir as synthetic symbols,
+  with chains repeated to num_expirations. Returns the synthetic symbols.
+  """
+  datestr = config.NOW.strftime('%Y%m%d')
+  source = PickleDirCache(fixture_dir)
+  target = PickleDirCache(cache_dir)
+
+  symbols = [f"SYN{i:03d}" for i in range(num_symbols)]
+  template_keys = _get_template_keys(fixture_dir, datestr, template)
+  template_expiry_datestrs = source.get(f"{datestr}/fetch_options_expirations-{template}")
+  expiry_datestrs = make_expiry_datestrs(template_expiry_datestrs, num_expirations)
+
+  # Synthetic symbols use the default regime start so clone the template's own regime.
+  template_start_date = config.TICKER_REGIME_START_DATE.get(template, config.REGIME_START_DATE_DEFAULT)
+  price_keys = [
+    key for key in template_keys
+    if not key.split('/')[-1].startswith(('fetch_options_chain-', 'fetch_options_expirations-'))
+    and all(datestr == template_start_date for datestr in DATESTR_PATTERN.findall(key))
+  ]
+
+  for symbol in symbols:
+    for key in price_keys:
+      synthetic_key = key.replace(template, symbol).replace(template_start_date, config.REGIME_START_DATE_DEFAULT)
+      target.set(synthetic_key, source.get(key))
+
+    target.set(f"{datestr}/fetch_options_expirations-{symbol}", expiry_datestrs)
+
+    for i, expiry_datestr in enumerate(expiry_datestrs):
+      template_datestr = template_expiry_datestrs[min(i, len(template_expiry_datestrs) - 1)]
+      # As fetch_options_chain now caches live responses.
+      chain = dict(get_chain_columns(source.get(f"{datestr}/fetch_options_chain-{template}_{template_datestr}")))
+      chain['expiration_date'] = np.full(len(chain['strike']), expiry_datestr, dtype='datetime64[D]')
+      target.set(f"{datestr}/fetch_options_chain-{symbol}_{expiry_datestr}", chain)
+
+  # Batched quotes as QuoteSnapshot.prime requests them.
+  price = source.get(f"{datestr}/fetch_latest_price-{template}")
+  batch_size = config.TRADIER_MAX_QUOTE_SYMBOLS
+  for i in range(0, num_symbols, batch_size):
+    batch = symbols[i:i + batch_size]
+    target.set(f"{datestr}/fetch_latest_prices-{','.join(batch)}", {symbol: price for symbol in batch})
+
+  return symbols
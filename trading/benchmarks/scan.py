@@ -0,0 +1,169 @@
+"""
+Times the scan hot paths on synthetic symbols cloned from the saved fixtures, eg
+
+$ ENV=test python -m benchmarks.scan -n 20 -e 17 -r 5 -o bench.json --compare baseline.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from collections import defaultdict
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+import cache
+import config
+
+from benchmarks.fixtures import make_synthetic_fixtures
+from constants import SIDE_SHORT
+from graphing import FigureManager
+from runners import Scanner, make_scan_signals
+from strategy.builds import SellSimplePutCreditSpreadBuild
+from utils import get_sig_level
+
+
+STAGES = ['load', 'make_snapshot', 'credit_spread_prepare_df', 'signals', 'scanner_run']
+
+
+def use_cache_dir(cache_dir):
+  # Env var too so spawned scan workers read the same cache.
+  os.environ['TRADING_CACHE_DIR'] = cache_dir
+  config.CACHE_DIR = cache_dir
+  cache._cache = None
+
+
+def time_calls(fn, repeat):
+  timings = []
+  for _ in range(repeat):
+    started_at = time.perf_counter()
+    fn()
+    timings.append(time.perf_counter() - started_at)
+  return timings
+
+
+def summarize(timings):
+  return dict(
+    min=min(timings),
+    median=statistics.median(timings),
+    mean=statistics.mean(timings),
+    runs=len(timings),
+  )
+
+
+def get_commit():
+  try:
+    return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True).stdout.strip()
+  except (OSError, subprocess.CalledProcessError):
+    return None
+
+
+def run_benchmarks(symbols, repeat, win_proba=config.MY_WIN_PROBA):
+  """
+  Seconds per call of each stage, timing per symbol stages on warm in-memory data, and bytes of all loaded chains.
+  """
+  build_class = SellSimplePutCreditSpreadBuild
+  option_type = 'put'
+  sig_level = get_sig_level(SIDE_SHORT, option_type, win_proba)
+  timings = defaultdict(list)
+  chain_bytes = 0
+
+  for symbol in symbols:
+    build = build_class(symbol, win_proba, signals=make_scan_signals())
+    strategy = build.strategy
+    next_earnings_date = strategy.get_price_model().get_next_earnings_date()
+
+    def make_snapshot():
+      # Unmemoized so every repeat times the snapshot path rather than a memo hit.
+      return strategy._make_snapshot(option_type, sig_level, expiry_before=next_earnings_date)
+
+    timings['load'] += time_calls(strategy._load, repeat)
+    chain_bytes += strategy.get_memory_report().loc['total', 'bytes']
+    timings['make_snapshot'] += time_calls(make_snapshot, repeat)
+    timings['credit_spread_prepare_df'] += time_calls(lambda: strategy._prepare_df(sig_level, option_type), repeat)
+
+    snapshot = make_snapshot()
+    timings['signals'] += time_calls(lambda: build.apply_signals(snapshot), repeat)
+
+  def scan():
+    Scanner(build_class, FigureManager(), symbols, win_proba=win_proba).run()
+
+  timings['scanner_run'] = time_calls(scan, repeat)
+  return {stage: summarize(timings[stage]) for stage in STAGES}, int(chain_bytes)
+
+
+def compare(results, baseline):
+  lines = [f"{'stage':<26}{'baseline':>12}{'current':>12}{'ratio':>8}"]
+  for stage in STAGES:
+    before = baseline['results'].get(stage, {}).get('median')
+    after = results['results'][stage]['median']
+    ratio = f"{after / before:.2f}" if before else '-'
+    before = f"{before * 1000:.2f}ms" if before else '-'
+    lines.append(f"{stage:<26}{before:>12}{after * 1000:>10.2f}ms{ratio:>8}")
+  return '\n'.join(lines)
+
+
+def main(argv=None):
+  parser = argparse.ArgumentParser()
+  parser.add_argument('-n', '--num-symbols', type=int, default=10)
+  parser.add_argument('-e', '--num-expirations', type=int, default=17)
+  parser.add_argument('-r', '--repeat', type=int, default=5)
+  parser.add_argument('-w', '--workers', type=int, default=os.cpu_count(), help='scan compute processes')
+  parser.add_argument('-o', '--outfile', help='JSON results (default stdout)')
+  parser.add_argument('-c', '--compare', help='JSON results of a baseline run')
+  args = parser.parse_args(argv)
+
+  if config.ENV != 'test':
+    sys.exit('Run with ENV=test for the frozen clock and saved fixtures.')
+
+  config.SCAN_COMPUTE_WORKERS = args.workers
+  # Keeps batched quote cache keys within filename limits.
+  config.TRADIER_MAX_QUOTE_SYMBOLS = min(config.TRADIER_MAX_QUOTE_SYMBOLS, 25)
+
+  with tempfile.TemporaryDirectory() as cache_dir:
+    symbols = make_synthetic_fixtures(cache_dir, args.num_symbols, args.num_expirations)
+    use_cache_dir(cache_dir)
+
+    # Scan progress would drown the results.
+    with contextlib.redirect_stdout(io.StringIO()):
+      results, chain_bytes = run_benchmarks(symbols, args.repeat)
+
+  output = dict(
+    commit=get_commit(),
+    created_at=datetime.now().isoformat(timespec='seconds'),
+    python=platform.python_version(),
+    numpy=np.__version__,
+    pandas=pd.__version__,
+    cpu_count=os.cpu_count(),
+    num_symbols=args.num_symbols,
+    num_expirations=args.num_expirations,
+    repeat=args.repeat,
+    workers=args.workers,
+    chain_bytes=chain_bytes,
+    results=results,
+  )
+
+  if args.outfile:
+    with open(args.outfile, 'w') as f:
+      json.dump(output, f, indent=2)
+  else:
+    print(json.dumps(output, indent=2))
+
+  if args.compare:
+    with open(args.compare) as f:
+      print(compare(output, json.load(f)), file=sys.stderr)
+
+  return output
+
+
+if __name__ == '__main__':
+  main()
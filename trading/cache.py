@@ -0,0 +1,232 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+
+import config
+
+from instrumentation import incr
+
+
+# Sentinel since None is a valid cached result.
+MISSING = object()
+
+
+class CacheBackend:
+
+  def get(self, key):
+    raise NotImplementedError
+
+  def set(self, key, value):
+    raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+  """
+  In-process LRU cache. Hits return the cached object itself so callers must not mutate results.
+  """
+
+  def __init__(self, maxsize=config.CACHE_MEMORY_MAXSIZE):
+    self.maxsize = maxsize
+    self._items = OrderedDict()
+    self._lock = threading.Lock()
+
+  def get(self, key):
+    with self._lock:
+      if key not in self._items:
+        return MISSING
+      self._items.move_to_end(key)
+      return self._items[key]
+
+  def set(self, key, value):
+    with self._lock:
+      self._items[key] = value
+      self._items.move_to_end(key)
+      while len(self._items) > self.maxsize:
+        self._items.popitem(last=False)
+
+  def clear(self):
+    with self._lock:
+      self._items.clear()
+
+
+class PickleDirCache(CacheBackend):
+  """
+  Legacy layout of one pickle per key, eg "<root>/20241024/fetch_latest_price-MDB.pkl".
+  Kept since tests/saved fixtures are stored this way.
+  """
+
+  def __init__(self, root=config.CACHE_DIR):
+    self.root = root
+
+  def _get_filepath(self, key):
+    return os.path.join(self.root, key + '.pkl')
+
+  def get(self, key):
+    filepath = self._get_filepath(key)
+    if not os.path.exists(filepath):
+      return MISSING
+    with open(filepath, 'rb') as f:
+      return pickle.load(f)
+
+  def set(self, key, value):
+    filepath = self._get_filepath(key)
+    dirpath = os.path.dirname(filepath)
+    os.makedirs(dirpath, exist_ok=True)
+
+    # Write to temp file then rename so concurrent readers never see a partial pickle.
+    fd, tmp_filepath = tempfile.mkstemp(dir=dirpath, suffix='.tmp')
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        pickle.dump(value, f)
+      os.replace(tmp_filepath, filepath)
+    except BaseException:
+      os.unlink(tmp_filepath)
+      raise
+
+
+class SqliteCache(CacheBackend):
+  """
+  Single file cache shared by threads and processes. Keys are hashed and
+  least recently used entries are evicted once the file exceeds max_bytes.
+  """
+
+  _TIMEOUT = 30  # in seconds to wait on another writer
+  _ACCESS_RESOLUTION = 60  # in seconds, so hits rarely need the write lock
+
+  def __init__(self, filepath, max_bytes=config.CACHE_MAX_BYTES):
+    self.filepath = filepath
+    self.max_bytes = max_bytes
+    self._local = threading.local()
+
+    dirpath = os.path.dirname(filepath)
+    if dirpath:
+      os.makedirs(dirpath, exist_ok=True)
+
+    conn = self._get_connection()
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute("""
+      CREATE TABLE IF NOT EXISTS cache (
+        key TEXT PRIMARY KEY,
+        value BLOB NOT NULL,
+        size INTEGER NOT NULL,
+        accessed_at REAL NOT NULL
+      )
+    """)
+    conn.execute('CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)')
+
+  def _get_connection(self):
+    # Connections cannot be shared across threads nor survive a fork.
+    pid = os.getpid()
+    if getattr(self._local, 'pid', None) != pid:
+      self._local.conn = sqlite3.connect(self.filepath, timeout=self._TIMEOUT, isolation_level=None)
+      self._local.pid = pid
+    return self._local.conn
+
+  @staticmethod
+  def hash_key(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+  def get(self, key):
+    conn = self._get_connection()
+    hashed_key = self.hash_key(key)
+    row = conn.execute('SELECT value, accessed_at FROM cache WHERE key = ?', (hashed_key,)).fetchone()
+    if row is None:
+      return MISSING
+
+    # Eviction order only needs coarse access times, eg not one write per hit of every scan worker.
+    value, accessed_at = row
+    now = time.time()
+    if now - accessed_at > self._ACCESS_RESOLUTION:
+      conn.execute('UPDATE cache SET accessed_at = ? WHERE key = ?', (now, hashed_key))
+    return pickle.loads(value)
+
+  def set(self, key, value):
+    conn = self._get_connection()
+    blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    # Single transaction so other processes see either the old or new value.
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+      conn.execute(
+        'INSERT OR REPLACE INTO cache (key, value, size, accessed_at) VALUES (?, ?, ?, ?)',
+        (self.hash_key(key), blob, len(blob), time.time())
+      )
+      self._evict(conn, keep_key=self.hash_key(key))
+      conn.execute('COMMIT')
+    except BaseException:
+      conn.execute('ROLLBACK')
+      raise
+
+  def _evict(self, conn, keep_key):
+    total_bytes = conn.execute('SELECT TOTAL(size) FROM cache').fetchone()[0]
+    if total_bytes <= self.max_bytes:
+      return
+
+    # Least recently used entries until enough bytes are freed, always keeping the entry just set.
+    conn.execute("""
+      DELETE FROM cache WHERE key IN (
+        SELECT key FROM (
+          SELECT key, SUM(size) OVER (ORDER BY accessed_at, key) - size AS freed_before
+          FROM cache WHERE key != ?
+        ) WHERE freed_before < ?
+      )
+    """, (keep_key, total_bytes - self.max_bytes))
+
+  def get_size(self):
+    return self._get_connection().execute('SELECT TOTAL(size) FROM cache').fetchone()[0]
+
+
+class TieredCache(CacheBackend):
+  """
+  Memory tier in front of a slower shared tier.
+  """
+
+  def __init__(self, memory, disk):
+    self.memory = memory
+    self.disk = disk
+
+  def get(self, key):
+    value = self.memory.get(key)
+    if value is not MISSING:
+      incr('cache_memory_hit')
+      return value
+
+    value = self.disk.get(key)
+    if value is not MISSING:
+      incr('cache_disk_hit')
+      self.memory.set(key, value)
+    return value
+
+  def set(self, key, value):
+    self.disk.set(key, value)
+    self.memory.set(key, value)
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def make_cache(backend=None):
+  backend = backend or config.CACHE_BACKEND
+  if backend == 'pickle':
+    disk = PickleDirCache(config.CACHE_DIR)
+  elif backend == 'sqlite':
+    disk = SqliteCache(os.path.join(config.CACHE_DIR, 'cache.sqlite3'))
+  else:
+    raise ValueError(f"Invalid cache backend: {backend}")
+
+  return TieredCache(MemoryCache(), disk)
+
+
+def get_cache():
+  global _cache
+  with _cache_lock:
+    if _cache is None:
+      _cache = make_cache()
+    return _cache
@@ -7,3 +7,6 @@ ENV = os.environ.get('ENV')
 
 if ENV == 'test':
   from .test import *
+
+# Lets tools point every process, including spawned workers, at another cache, eg benchmark fixtures.
+CACHE_DIR = os.environ.get('TRADING_CACHE_DIR', CACHE_DIR)
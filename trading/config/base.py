@@ -1,4 +1,6 @@
+import os
 import pytz
+import tempfile
 
 from datetime import datetime
 
@@ -15,6 +17,8 @@ IS_PHONE = False
 MY_WIN_PROBA = 0.85
 SKIP_GRAPHS = False
 SHOW_GRAPHS = True
+RENDER_FORMAT = 'png'  # or 'svg' for headless renders
+RENDER_WORKERS = os.cpu_count()  # processes rendering figures to files
 IS_DEBUG = True
 IS_VERBOSE = False
 SHOULD_AVOID_EARNINGS = True
@@ -28,13 +32,31 @@ MAX_STRIKE = 280
 
 FROZEN_TEST_DATE = '2024-07-22'
 CACHE_DIR = './cache'
-
+PRICE_STORE_DIR = './store/prices'  # None to always fetch full history
+CHAIN_ARCHIVE_DIR = './store/chains'  # None to skip archiving
+CACHE_BACKEND = 'sqlite'  # or 'pickle' for one file per call
+CACHE_MEMORY_MAXSIZE = 1024  # entries kept in process
+CACHE_MAX_BYTES = 1024 * 1024 * 1024  # on disk
+
+TRADIER_BASE_URL = os.environ.get('TRADIER_BASE_URL', 'https://api.tradier.com')  # eg replay server
+TRADIER_RECORD_DIR = os.environ.get('TRADIER_RECORD_DIR')  # save responses for replay
+TRADIER_MAX_RETRIES = 3  # on 429
 TRADIER_THROTTLE_RATE = 119 # per minute
 TRADIER_THROTTLE_PERIOD = 61  # in seconds
+TRADIER_THROTTLE_BURST = 119  # max tokens in bucket
+TRADIER_THROTTLE_FILEPATH = os.path.join(tempfile.gettempdir(), 'tradier_throttle.json')  # shared by all processes
+TRADIER_TIMEOUT = 10  # in seconds
+TRADIER_POOL_SIZE = 8  # max concurrent connections/requests
+TRADIER_MAX_QUOTE_SYMBOLS = 100  # per quotes request
 
 EASTERN_TIMEZONE = pytz.timezone('America/New_York')
 NOW = datetime.utcnow().replace(tzinfo=pytz.UTC).astimezone(EASTERN_TIMEZONE)
 NUM_PARALLEL_JOBS = 4
+SCAN_FETCH_WORKERS = 4  # threads fetching symbols, throttled by the rate limiter
+SCAN_COMPUTE_WORKERS = os.cpu_count()  # processes building snapshots, 0 to build in the main process
+SCAN_QUEUE_SIZE = 8  # max symbols fetched ahead of compute
+WATCH_INTERVAL = 60  # in seconds between quote refreshes
+WATCH_MOVE_THRESHOLD = 0.005  # log move of underlying since last chain fetch to re-fetch chains
 FORCE_REFRESH = False
 
 SIGNAL_MAX_PROBA_GLOBAL = 0.025
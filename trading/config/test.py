@@ -8,10 +8,14 @@ TICKER_REGIME_START_DATE = dict(
 )
 
 CACHE_DIR = './tests/saved'
+CACHE_BACKEND = 'pickle'  # fixtures are saved as pickles
+PRICE_STORE_DIR = None
+CHAIN_ARCHIVE_DIR = None
 IS_DEBUG = True
 MIN_ZSCORE_THRESHOLD = 0
 MY_WIN_PROBA = 0.90
 SHOW_GRAPHS = False
+SCAN_COMPUTE_WORKERS = 1
 
 WORTHY_MIN_BID = 0.1
 
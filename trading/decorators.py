@@ -1,53 +1,63 @@
 import functools
-import os
-import pickle
-import subprocess
 
 import config
 
+from cache import MISSING, get_cache
+from instrumentation import incr, span
 from utils import printout
 
 
+def make_cache_key(fn_name, args, kwargs, use_time=False):
+  # eg "20241024/fetch_options_chain-MDB_2024-10-25"
+  today_datestr = config.NOW.strftime('%Y%m%d')
+
+  argstr = '_'.join([str(arg) for arg in args])
+  kwstr = '_'.join([str(v) for v in kwargs.values()])
+  key_parts = [part for part in [fn_name, argstr, kwstr] if part]
+  if use_time:
+    now_timestr = config.NOW.strftime('%H%M')
+    key_parts = [now_timestr, *key_parts]
+
+  return today_datestr + '/' + '-'.join(key_parts)
+
+
 def cached(force_refresh=False, use_time=False):
   """
-  A function that creates a decorator which will use "cache_filepath" for caching the results of the decorated function "fn".
+  A function that creates a decorator which will use the configured cache backend for caching the results of the decorated function "fn".
   """
   def decorator(fn):  # define a decorator for a function "fn"
 
     @functools.wraps(fn)
     def wrapped(*args, **kwargs):   # define a wrapper that will finally call "fn" with all arguments
 
-      # Create cache folder if not exist.
-      today_datestr = config.NOW.strftime('%Y%m%d')
-      cache_dir = os.path.join(config.CACHE_DIR, today_datestr)
-      if not os.path.exists(cache_dir):
-        subprocess.run(['mkdir', cache_dir])
-
-      # if cache exists -> load it and return its content
-      argstr = '_'.join([str(arg) for arg in args])
-      kwstr = '_'.join([str(v) for v in kwargs.values()])
-      filename_parts = [part for part in [fn.__name__, argstr, kwstr] if part]
-      if use_time:
-        now_timestr = config.NOW.strftime('%H%M')
-        filename_parts = [now_timestr, *filename_parts]
-
-      cache_filename = '-'.join(filename_parts) + '.pkl'
-      cache_filepath = os.path.join(cache_dir, cache_filename)
-      if os.path.exists(cache_filepath) and not force_refresh:
-        with open(cache_filepath, 'rb') as cachehandle:
-          printout("Using cached result from '%s'" % cache_filepath)
-          return pickle.load(cachehandle)
+      cache = get_cache()
+      cache_key = make_cache_key(fn.__name__, args, kwargs, use_time=use_time)
+
+      # if cache exists -> return its content
+      if not force_refresh:
+        with span('cache_get'):
+          res = cache.get(cache_key)
+        if res is not MISSING:
+          incr(f"cache_hit:{fn.__name__}")
+          printout("Using cached result from '%s'" % cache_key)
+          return res
+        incr(f"cache_miss:{fn.__name__}")
 
       # execute the function with all arguments passed
       res = fn(*args, **kwargs)
 
-      # write to cache file
-      with open(cache_filepath, 'wb') as cachehandle:
-        printout("Saving result to cache '%s'" % cache_filepath)
-        pickle.dump(res, cachehandle)
+      printout("Saving result to cache '%s'" % cache_key)
+      cache.set(cache_key, res)
+
+      return res
 
+    def refresh(*args, **kwargs):
+      # Always call "fn" and overwrite the cache, eg for live data in long running processes.
+      res = fn(*args, **kwargs)
+      get_cache().set(make_cache_key(fn.__name__, args, kwargs, use_time=use_time), res)
       return res
 
+    wrapped.refresh = refresh
     return wrapped
 
   return decorator
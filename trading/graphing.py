@@ -1,16 +1,20 @@
+import inspect
 import math
-import matplotlib.pyplot as plt
+import multiprocessing
 import os
+import re
 
 import config
 
 from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 
 from constants import (
   FIG_WIDTH,
   FIG_HEIGHT,
   FIG_NCOLS,
 )
+from instrumentation import timed
 
 
 class FigureManager:
@@ -26,8 +30,33 @@ class FigureManager:
     self.figures[title] = []
     self.current_figure = self.figures[title]
 
+  @staticmethod
+  def _draw_figure(fig_title, graphs, interactive=True):
+    import matplotlib.pyplot as plt
+
+    # No empty panels when there are fewer graphs than columns, eg a figure split per symbol.
+    ncols = min(FIG_NCOLS, len(graphs))
+    nrows = math.ceil(len(graphs) / ncols)
+    fig, axes = plt.subplots(nrows, ncols, figsize=(FIG_WIDTH, FIG_HEIGHT), squeeze=False)
+
+    fig.canvas.manager.set_window_title(fig_title)
+
+    for ax, graph in zip(axes.flat, graphs):
+      graph_fn, args, kwargs = graph
+
+      print()
+      if accepts_interactive(graph_fn):
+        kwargs = dict(kwargs, interactive=interactive)
+      graph_fn(ax, *args, **kwargs)
+
+    fig.subplots_adjust()
+    plt.tight_layout()
+    return fig
+
+  @timed('render')
   def render(self):
-    
+    import matplotlib.pyplot as plt
+
     if config.SKIP_GRAPHS:
       print(f"Disabled render (config.SKIP_GRAPHS={config.SKIP_GRAPHS}).")
       return
@@ -36,31 +65,81 @@ class FigureManager:
       if len(graphs) == 0:
         print('Skipping', fig_title, '- no graphs to render.')
         continue
-      
-      nrows = math.ceil(len(graphs) / FIG_NCOLS)
-      ncols = FIG_NCOLS
-      fig, axes = plt.subplots(nrows, ncols, figsize=(FIG_WIDTH, FIG_HEIGHT))
-
-      fig.canvas.manager.set_window_title(fig_title)
 
-      for i, graph in enumerate(graphs):
-        graph_fn, args, kwargs = graph
-
-        if nrows == 1 or ncols == 1:
-          ax = axes[i]
-        else:
-          row_index = i // 2
-          col_index = i % 2
-          ax = axes[row_index, col_index]
-
-        print()
-        graph_fn(ax, *args, **kwargs)
-
-      fig.subplots_adjust()
-      plt.tight_layout()
+      # Tooltips only matter when someone can hover.
+      self._draw_figure(fig_title, graphs, interactive=config.SHOW_GRAPHS)
 
     if config.SHOW_GRAPHS:
       print('Rendering in Output tab...')
       plt.show()
     else:
       print(f"config.SHOW_GRAPHS={config.SHOW_GRAPHS}")
+
+  @timed('render')
+  def render_to_files(self, outdir, fmt=config.RENDER_FORMAT, max_workers=config.RENDER_WORKERS):
+    """
+    Headless render of each figure to "<outdir>/<title>.<fmt>" on a process pool. Returns filepaths.
+    Figures of several symbols, eg a scan, are split into "<outdir>/<title>_<symbol>.<fmt>" so they render in parallel.
+    """
+    os.makedirs(outdir, exist_ok=True)
+
+    jobs = []
+    for fig_title, graphs in self.figures.items():
+      if len(graphs) == 0:
+        print('Skipping', fig_title, '- no graphs to render.')
+        continue
+      for title, symbol_graphs in split_by_symbol(fig_title, graphs):
+        filepath = os.path.join(outdir, re.sub(r'[^\w.-]+', '_', title) + '.' + fmt)
+        jobs.append((title, symbol_graphs, filepath))
+
+    if not jobs:
+      return []
+
+    # Spawned workers start clean on Agg rather than inherit an interactive backend.
+    with ProcessPoolExecutor(
+      max_workers=min(max_workers, len(jobs)),
+      mp_context=multiprocessing.get_context('spawn'),
+      initializer=use_headless_backend,
+    ) as executor:
+      filepaths = list(executor.map(render_figure_file, *zip(*jobs)))
+
+    for filepath in filepaths:
+      print('Rendered', filepath)
+    return filepaths
+
+
+def accepts_interactive(graph_fn):
+  # Only some graphs, eg graph_roi_vs_expiry, have tooltips to skip when headless.
+  try:
+    return 'interactive' in inspect.signature(graph_fn).parameters
+  except (TypeError, ValueError):
+    return False
+
+
+def split_by_symbol(fig_title, graphs):
+  """
+  Pairs of (title, graphs) with one per symbol when graphs are of several symbols, else the figure as is.
+  """
+  symbol_graphs = OrderedDict()
+  for graph in graphs:
+    graph_fn = graph[0]
+    symbol = getattr(getattr(graph_fn, '__self__', None), 'symbol', None)
+    symbol_graphs.setdefault(symbol, []).append(graph)
+
+  if len(symbol_graphs) <= 1 or None in symbol_graphs:
+    return [(fig_title, graphs)]
+  return [(f"{fig_title}_{symbol}", graphs) for symbol, graphs in symbol_graphs.items()]
+
+
+def use_headless_backend():
+  import matplotlib
+  matplotlib.use('Agg')
+
+
+def render_figure_file(fig_title, graphs, filepath):
+  import matplotlib.pyplot as plt
+
+  fig = FigureManager._draw_figure(fig_title, graphs, interactive=False)
+  fig.savefig(filepath)
+  plt.close(fig)
+  return filepath
@@ -0,0 +1,186 @@
+import contextvars
+import functools
+import threading
+import time
+
+from collections import defaultdict
+from contextlib import contextmanager
+
+
+# Spans inherit the symbol of the span they are nested in.
+_symbol = contextvars.ContextVar('symbol', default=None)
+_stats = contextvars.ContextVar('stats', default=None)
+
+
+class Stats:
+  """
+  Wall clock timings per (stage, symbol) and named counters. Timings of nested
+  stages are inclusive, eg "compute" includes its "signals".
+  """
+
+  def __init__(self):
+    self._lock = threading.Lock()
+    self.timings = defaultdict(lambda: [0, 0.0, 0.0])  # (stage, symbol) -> [calls, total, max] seconds
+    self.counters = defaultdict(int)
+
+  def __getstate__(self):
+    # Picklable so worker processes can send stats back with their results.
+    return dict(timings=dict(self.timings), counters=dict(self.counters))
+
+  def __setstate__(self, state):
+    self.__init__()
+    self.timings.update(state['timings'])
+    self.counters.update(state['counters'])
+
+  def add_timing(self, stage, seconds, symbol=None):
+    with self._lock:
+      timing = self.timings[(stage, symbol)]
+      timing[0] += 1
+      timing[1] += seconds
+      timing[2] = max(timing[2], seconds)
+
+  def incr(self, name, n=1):
+    with self._lock:
+      self.counters[name] += n
+
+  def merge(self, other):
+    with self._lock:
+      for key, (calls, total, longest) in other.timings.items():
+        timing = self.timings[key]
+        timing[0] += calls
+        timing[1] += total
+        timing[2] = max(timing[2], longest)
+      for name, n in other.counters.items():
+        self.counters[name] += n
+
+  def clear(self):
+    with self._lock:
+      self.timings.clear()
+      self.counters.clear()
+
+  def get_stages(self):
+    """
+    Timings summed over symbols, by stage.
+    """
+    stages = defaultdict(lambda: [0, 0.0, 0.0])
+    for (stage, _), (calls, total, longest) in list(self.timings.items()):
+      timing = stages[stage]
+      timing[0] += calls
+      timing[1] += total
+      timing[2] = max(timing[2], longest)
+    return {
+      stage: dict(calls=calls, total=total, mean=total / calls, max=longest)
+      for stage, (calls, total, longest) in stages.items()
+    }
+
+  def get_symbols(self):
+    """
+    Total seconds per stage, by symbol.
+    """
+    symbols = defaultdict(dict)
+    for (stage, symbol), (_, total, _) in list(self.timings.items()):
+      if symbol is not None:
+        symbols[symbol][stage] = total
+    return dict(symbols)
+
+  def get_cache_ratios(self):
+    """
+    Hit ratio per cached function, from "cache_hit:<fn>" and "cache_miss:<fn>" counters.
+    """
+    hits = defaultdict(int)
+    lookups = defaultdict(int)
+    for name, n in list(self.counters.items()):
+      kind, _, fn_name = name.partition(':')
+      if kind in ('cache_hit', 'cache_miss'):
+        lookups[fn_name] += n
+        hits[fn_name] += n if kind == 'cache_hit' else 0
+    return {fn_name: hits[fn_name] / n for fn_name, n in lookups.items()}
+
+  def to_dict(self):
+    return dict(
+      stages=self.get_stages(),
+      symbols=self.get_symbols(),
+      counters=dict(self.counters),
+      cache_ratios=self.get_cache_ratios(),
+    )
+
+  def format_summary(self):
+    lines = [f"{'stage':<40}{'calls':>8}{'total_s':>10}{'mean_ms':>10}{'max_ms':>10}"]
+    stages = sorted(self.get_stages().items(), key=lambda item: -item[1]['total'])
+    for stage, timing in stages:
+      lines.append(f"{stage:<40}{timing['calls']:>8}{timing['total']:>10.3f}{timing['mean'] * 1000:>10.2f}{timing['max'] * 1000:>10.2f}")
+
+    cache_ratios = self.get_cache_ratios()
+    if cache_ratios:
+      lines += ['', f"{'cached function':<40}{'lookups':>8}{'hit_ratio':>10}"]
+      for fn_name, ratio in sorted(cache_ratios.items()):
+        lookups = self.counters[f"cache_hit:{fn_name}"] + self.counters[f"cache_miss:{fn_name}"]
+        lines.append(f"{fn_name:<40}{lookups:>8}{ratio:>10.2f}")
+
+    counters = {name: n for name, n in self.counters.items() if not name.startswith(('cache_hit:', 'cache_miss:'))}
+    if counters:
+      lines += ['', f"{'counter':<40}{'count':>8}"]
+      lines += [f"{name:<40}{n:>8}" for name, n in sorted(counters.items())]
+
+    symbols = self.get_symbols()
+    if symbols:
+      symbol_stages = [stage for stage, _ in stages if any(stage in totals for totals in symbols.values())]
+      lines += ['', f"{'symbol (total_s)':<18}" + ''.join(f"{stage[:12]:>13}" for stage in symbol_stages)]
+      for symbol, totals in sorted(symbols.items()):
+        lines.append(f"{symbol:<18}" + ''.join(f"{totals.get(stage, 0):>13.3f}" for stage in symbol_stages))
+
+    return '\n'.join(lines)
+
+
+_process_stats = Stats()
+
+
+def get_stats():
+  # Stats being collected in this context, otherwise the process wide stats.
+  return _stats.get() or _process_stats
+
+
+@contextmanager
+def collect():
+  """
+  Record into fresh stats within this context, eg to send a worker's stats back with its result.
+  """
+  stats = Stats()
+  token = _stats.set(stats)
+  try:
+    yield stats
+  finally:
+    _stats.reset(token)
+
+
+@contextmanager
+def span(stage, symbol=None):
+  token = _symbol.set(symbol) if symbol else None
+  started_at = time.perf_counter()
+  try:
+    yield
+  finally:
+    get_stats().add_timing(stage, time.perf_counter() - started_at, symbol=_symbol.get())
+    if token:
+      _symbol.reset(token)
+
+
+def timed(stage):
+  """
+  Decorator recording each call as a span.
+  """
+  def decorator(fn):
+    @functools.wraps(fn)
+    def wrapped(*args, **kwargs):
+      with span(stage):
+        return fn(*args, **kwargs)
+    return wrapped
+  return decorator
+
+
+def record(stage, seconds, symbol=None):
+  get_stats().add_timing(stage, seconds, symbol=symbol)
+
+
+def incr(name, n=1):
+  get_stats().incr(name, n)
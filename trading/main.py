@@ -1,4 +1,5 @@
 import argparse
+import json
 import sys
 import traceback
 
@@ -7,32 +8,76 @@ import config
 from constants import (
   SIDE_SHORT, WATCHLIST
 )
-from graphing import FigureManager
-from runners import Scanner, PutDiver
-from strategy.builds import SellSimplePutCreditSpreadBuild, SellSimplePutBuild
+from writers import WRITERS
 
 
-if __name__ == '__main__':
+COMMANDS = ('scan', 'dd', 'watch')
+
+
+def main(argv=None):
 
   parser = argparse.ArgumentParser()
   parser.add_argument('command')
   parser.add_argument('-t', '--tickers')
   parser.add_argument('-s', '--strategy')
   parser.add_argument('-p', '--proba')
+  parser.add_argument('-o', '--output', choices=WRITERS.keys(), help='stream scan results instead of graphing (watch defaults to ndjson)')
+  parser.add_argument('-f', '--outfile', help='file for --output (default stdout)')
+  parser.add_argument('-r', '--render-dir', help='render figures headless to image files in this dir')
+  parser.add_argument('--render-format', choices=['png', 'svg'], default=config.RENDER_FORMAT)
+  parser.add_argument('--stats-file', help='also export scan/dd timings and counters as JSON')
 
-  args = parser.parse_args()
+  args = parser.parse_args(argv)
 
   cmd = args.command
+  if cmd not in COMMANDS:
+    print(f"Invalid command - either 'scan', 'dd' or 'watch'")
+    sys.exit(1)
+
   tickers = args.tickers.upper().split(',') if args.tickers else WATCHLIST.keys()
   strategy_input = args.strategy
   win_proba = float(args.proba) if args.proba else config.MY_WIN_PROBA
 
+  # Heavy dependencies (pandas, requests, ...) load only once the command is known to be valid.
+  from instrumentation import get_stats
+  from strategy.builds import SellSimplePutCreditSpreadBuild
+  from watch import Watcher
+  from writers import write_snapshots
+
+  if cmd == 'watch':
+    watcher = Watcher(SellSimplePutCreditSpreadBuild, tickers, win_proba=win_proba)
+    write_snapshots(watcher.run(), args.output or 'ndjson', filepath=args.outfile)
+    return
+
+  try:
+    run(cmd, args, tickers, win_proba)
+  finally:
+    # Stderr keeps streamed output on stdout clean.
+    stats = get_stats()
+    print(stats.format_summary(), file=sys.stderr)
+    if args.stats_file:
+      with open(args.stats_file, 'w') as f:
+        json.dump(stats.to_dict(), f, indent=2)
+
+
+def run(cmd, args, tickers, win_proba):
+  from graphing import FigureManager, use_headless_backend
+  from runners import Scanner, PutDiver
+  from strategy.builds import SellSimplePutCreditSpreadBuild, SellSimplePutBuild
+  from writers import write_snapshots
+
+  if args.render_dir:
+    use_headless_backend()
+
   figman = FigureManager()
   runner = None
 
   if cmd == 'scan':
     build = SellSimplePutCreditSpreadBuild
     runner = Scanner(build, figman, tickers, win_proba=win_proba)
+    if args.output:
+      write_snapshots(runner.iter_snapshots(), args.output, filepath=args.outfile)
+      return
     runner.run()
 
   elif cmd == 'dd':
@@ -40,8 +85,11 @@ if __name__ == '__main__':
     runner = PutDiver(build, figman, tickers)
     runner.run(side=SIDE_SHORT)  # FIXME? vjw
 
+  if args.render_dir:
+    figman.render_to_files(args.render_dir, fmt=args.render_format)
   else:
-    print(f"Invalid command - either 'scan' or 'dd'")
-    sys.exit(1)
+    figman.render()
+
 
-  figman.render()
+if __name__ == '__main__':
+  main()
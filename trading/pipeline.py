@@ -0,0 +1,126 @@
+import multiprocessing
+import queue
+import threading
+
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+
+_DONE = object()
+
+
+class Pipeline:
+  """
+  Runs each item through an I/O bound fetch stage on threads, then a CPU
+  bound compute stage on processes, and yields (item, result, error) to a
+  single consumer in completion order.
+
+  Queues between stages are bounded so fetches never run more than
+  queue_size items ahead of compute. With compute_workers=0 compute runs in
+  the consumer's thread instead, eg for debugging.
+  """
+
+  _POLL_INTERVAL = 0.05  # in seconds
+
+  def __init__(self, fetch_fn, compute_fn, fetch_workers=1, compute_workers=0, queue_size=None, initializer=None, initargs=()):
+    self.fetch_fn = fetch_fn
+    self.compute_fn = compute_fn
+    self.fetch_workers = max(1, fetch_workers)
+    self.compute_workers = compute_workers
+    self.queue_size = queue_size or 2 * max(1, compute_workers)
+    self.initializer = initializer
+    self.initargs = initargs
+
+  def _fetch_worker(self, inputs, fetched, stop):
+    while not stop.is_set():
+      try:
+        item = inputs.get_nowait()
+      except queue.Empty:
+        break
+
+      try:
+        self.fetch_fn(item)
+        entry = (item, None)
+      except Exception as e:
+        entry = (item, e)
+      self._put(fetched, entry, stop)
+
+    self._put(fetched, _DONE, stop)
+
+  def _put(self, fetched, entry, stop):
+    # Blocks while compute is behind, unless the consumer went away.
+    while not stop.is_set():
+      try:
+        fetched.put(entry, timeout=self._POLL_INTERVAL)
+        return
+      except queue.Full:
+        continue
+
+  def _make_executor(self):
+    if self.compute_workers == 0:
+      if self.initializer:
+        self.initializer(*self.initargs)
+      return None
+
+    # Spawn since forking while fetch threads hold locks can deadlock children.
+    return ProcessPoolExecutor(
+      max_workers=self.compute_workers,
+      mp_context=multiprocessing.get_context('spawn'),
+      initializer=self.initializer,
+      initargs=self.initargs,
+    )
+
+  def run(self, items):
+    inputs = queue.Queue()
+    for item in items:
+      inputs.put(item)
+
+    fetched = queue.Queue(maxsize=self.queue_size)
+    stop = threading.Event()
+    threads = [
+      threading.Thread(target=self._fetch_worker, args=(inputs, fetched, stop), daemon=True)
+      for _ in range(self.fetch_workers)
+    ]
+    for thread in threads:
+      thread.start()
+
+    executor = self._make_executor()
+    max_pending = max(1, self.compute_workers) + self.queue_size
+    num_fetching = len(threads)
+    pending = dict()
+
+    try:
+      while num_fetching or pending:
+
+        # Hand fetched items to compute, only blocking when nothing else is in flight.
+        while num_fetching and len(pending) < max_pending:
+          try:
+            entry = fetched.get_nowait() if pending else fetched.get()
+          except queue.Empty:
+            break
+
+          if entry is _DONE:
+            num_fetching -= 1
+            continue
+
+          item, error = entry
+          if error is not None:
+            yield item, None, error
+          elif executor is None:
+            try:
+              yield item, self.compute_fn(item), None
+            except Exception as e:
+              yield item, None, e
+          else:
+            pending[executor.submit(self.compute_fn, item)] = item
+
+        if pending:
+          done, _ = wait(pending, timeout=self._POLL_INTERVAL, return_when=FIRST_COMPLETED)
+          for future in done:
+            item = pending.pop(future)
+            error = future.exception()
+            yield item, (None if error else future.result()), error
+
+    finally:
+      stop.set()
+      if executor is not None:
+        executor.shutdown(cancel_futures=True)
@@ -0,0 +1,72 @@
+import threading
+
+import config
+
+from contextlib import contextmanager
+
+from utils import printout
+from vendors.tradier import fetch_latest_price, fetch_latest_prices
+
+
+class QuoteSnapshot:
+  """
+  Latest prices fetched once per run so every consumer sees the same price.
+  """
+
+  def __init__(self):
+    self.prices = dict()
+    self._lock = threading.Lock()
+
+  def prime(self, symbols):
+    with self._lock:
+      missing = [symbol for symbol in dict.fromkeys(symbols) if symbol not in self.prices]
+      self._fetch(missing)
+
+  def refresh(self, symbols):
+    """
+    Fetch live quotes for all symbols, skipping the cache.
+    """
+    with self._lock:
+      self._fetch(list(dict.fromkeys(symbols)), refresh=True)
+
+  def _fetch(self, symbols, refresh=False):
+    # Reuse the single quote call (and its cache) when there is nothing to batch.
+    if len(symbols) == 1:
+      symbol = symbols[0]
+      self.prices[symbol] = fetch_latest_price.refresh(symbol) if refresh else fetch_latest_price(symbol)
+      return
+
+    fetch_fn = fetch_latest_prices.refresh if refresh else fetch_latest_prices
+    batch_size = config.TRADIER_MAX_QUOTE_SYMBOLS
+    for i in range(0, len(symbols), batch_size):
+      batch = symbols[i:i + batch_size]
+      prices = fetch_fn(','.join(batch))
+      printout(f"Fetched {len(prices)} quotes for {len(batch)} symbols.")
+      self.prices.update(prices)
+
+  def get(self, symbol):
+    return self.prices.get(symbol)
+
+  def clear(self):
+    with self._lock:
+      self.prices = dict()
+
+
+_snapshot = QuoteSnapshot()
+
+
+def get_quote_snapshot():
+  return _snapshot
+
+
+@contextmanager
+def use_quote_snapshot(symbols):
+  """
+  Fetch quotes for all symbols up front and serve them until the block exits.
+  """
+  previous_prices = dict(_snapshot.prices)
+  _snapshot.prime(symbols)
+  try:
+    yield _snapshot
+  finally:
+    _snapshot.prices = previous_prices
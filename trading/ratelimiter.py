@@ -0,0 +1,151 @@
+import fcntl
+import json
+import os
+import threading
+import time
+
+from contextlib import contextmanager
+
+import config
+
+from utils import printout
+
+
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_LOW = 2
+
+# Fraction of the bucket each priority must leave for higher priorities.
+PRIORITY_RESERVES = {
+  PRIORITY_HIGH: 0,
+  PRIORITY_NORMAL: 0.1,
+  PRIORITY_LOW: 0.5,
+}
+
+
+class TokenBucket:
+  """
+  Token bucket whose state lives in a file guarded by flock so every thread
+  and process on the machine shares one quota. A sliding window of call
+  times also caps calls per period since a full bucket plus refills could
+  otherwise exceed the quota.
+  """
+
+  def __init__(self, filepath, rate, period, burst=None, clock=time.time, sleep=time.sleep):
+    self.filepath = filepath
+    self.rate = rate
+    self.period = period
+    self.capacity = burst or rate
+    self.refill_per_second = rate / period
+    self._clock = clock
+    self._sleep = sleep
+
+    dirpath = os.path.dirname(filepath)
+    if dirpath:
+      os.makedirs(dirpath, exist_ok=True)
+
+  def _read_state(self):
+    try:
+      with open(self.filepath) as f:
+        return json.load(f)
+    except FileNotFoundError:
+      return None
+    except ValueError:
+      # Eg a file truncated by an older version, so start over rather than block every call.
+      printout(f"Resetting unreadable rate limit state in {self.filepath}")
+      return None
+
+  def _write_state(self, state):
+    # Replaced whole so a process killed mid write never leaves partial state.
+    tmp_filepath = f"{self.filepath}.{os.getpid()}.tmp"
+    with open(tmp_filepath, 'w') as f:
+      json.dump(state, f)
+    os.replace(tmp_filepath, self.filepath)
+
+  @contextmanager
+  def _locked_state(self):
+    # Locks a separate file since replacing the state file swaps its inode.
+    with open(self.filepath + '.lock', 'a') as lock_f:
+      fcntl.flock(lock_f, fcntl.LOCK_EX)
+      try:
+        now = self._clock()
+        state = self._refill(self._read_state(), now)
+
+        yield state
+
+        self._write_state(state)
+      finally:
+        fcntl.flock(lock_f, fcntl.LOCK_UN)
+
+  def _refill(self, state, now):
+    if state is None:
+      return dict(tokens=self.capacity, updated_at=now, calls=[])
+
+    elapsed = max(0, now - state['updated_at'])
+    state['tokens'] = min(self.capacity, state['tokens'] + elapsed * self.refill_per_second)
+    state['updated_at'] = now
+    state['calls'] = [t for t in state['calls'] if now - t < self.period]
+    return state
+
+  def _get_wait(self, state, now, priority):
+    reserve = self.capacity * PRIORITY_RESERVES[priority]
+    wait = 0
+
+    if state['tokens'] - 1 < reserve:
+      wait = (reserve + 1 - state['tokens']) / self.refill_per_second
+
+    if len(state['calls']) >= self.rate:
+      oldest = state['calls'][-1 * self.rate]
+      wait = max(wait, oldest + self.period - now)
+
+    return wait
+
+  def try_acquire(self, priority=PRIORITY_NORMAL):
+    """
+    Returns 0 if a token was taken, otherwise seconds to wait before trying again.
+    """
+    with self._locked_state() as state:
+      wait = self._get_wait(state, state['updated_at'], priority)
+      if wait > 0:
+        return wait
+
+      state['tokens'] -= 1
+      state['calls'].append(state['updated_at'])
+      return 0
+
+  def acquire(self, priority=PRIORITY_NORMAL):
+    while True:
+      wait = self.try_acquire(priority=priority)
+      if wait == 0:
+        return
+      printout(f"Rate limited - waiting {wait:.2f}s (priority={priority})")
+      self._sleep(wait)
+
+  def get_usage(self):
+    """
+    Calls made in the current period across all processes.
+    """
+    with self._locked_state() as state:
+      return dict(
+        calls=len(state['calls']),
+        rate=self.rate,
+        period=self.period,
+        tokens=round(state['tokens'], 2),
+      )
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+  global _limiter
+  with _limiter_lock:
+    if _limiter is None:
+      _limiter = TokenBucket(
+        config.TRADIER_THROTTLE_FILEPATH,
+        config.TRADIER_THROTTLE_RATE,
+        config.TRADIER_THROTTLE_PERIOD,
+        burst=config.TRADIER_THROTTLE_BURST,
+      )
+    return _limiter
@@ -1,18 +1,53 @@
+import functools
 import traceback
 
 import config
 
-from joblib import Parallel, delayed
-
+from instrumentation import collect, get_stats, span
+from pipeline import Pipeline
+from quotes import get_quote_snapshot, use_quote_snapshot
 from signals import (
   MoveSignal,
   DeltaSignal,
   FiftyTwoLowSupportSignal,
   MovingAverageSupportSignal,
 )
+from strategy.pool import StrategyPool
 from utils import strformat, get_win_proba
 
 
+def init_scan_worker(now, prices):
+  # Workers share the run's clock and quotes so cache keys and prices agree.
+  config.NOW = now
+  get_quote_snapshot().prices = dict(prices)
+
+
+def make_scan_signals():
+  return [
+    MoveSignal(),
+    DeltaSignal(),
+    FiftyTwoLowSupportSignal(),
+    MovingAverageSupportSignal(200, weight=0.5),
+  ]
+
+
+def prefetch_scan_symbol(build, symbol):
+  with span('fetch', symbol=symbol):
+    build.prefetch(symbol)
+
+
+def create_scan_snapshot(build, win_proba, symbol):
+  with span('compute', symbol=symbol):
+    return build(symbol, win_proba, signals=make_scan_signals()).create_snapshot()
+
+
+def collect_scan_snapshot(build, win_proba, symbol):
+  # Stats recorded in a worker process would otherwise be lost with it.
+  with collect() as stats:
+    snapshot = create_scan_snapshot(build, win_proba, symbol)
+  return snapshot, stats
+
+
 class Runner:
   def __init__(self, build, figman, symbols, *args):
     self.figman = figman
@@ -31,40 +66,68 @@ class Scanner(Runner):
     super().__init__(*args, **kwargs)
     self.win_proba = win_proba
 
-  def _run_iter(self, symbol):
-    signals = [
-      MoveSignal(),
-      DeltaSignal(),
-      FiftyTwoLowSupportSignal(),
-      MovingAverageSupportSignal(200, weight=0.5),
-    ]
-    try:
-      snapshot = self.build(symbol, self.win_proba, signals=signals).create_snapshot()
-      if snapshot:
-        self.figman.add_graph_as_ax(snapshot.graph_roi_vs_expiry)
-        print(strformat(snapshot.symbol, f"Adding subplot (WORTHY_MIN_BID={config.WORTHY_MIN_BID}, WORTHY_MIN_ROI={config.WORTHY_MIN_ROI})\n \"{snapshot.title}\"\n"))
-
-    except Exception as e:
-      print(strformat(symbol, f"Skipping - {e}"))
-      if config.IS_DEBUG:
-        traceback.print_exc()
-        raise e
+  def iter_snapshots(self):
+    """
+    Yields each symbol's snapshot as soon as it is built.
+    """
+    with use_quote_snapshot(self.symbols) as quotes:
+      pipeline = Pipeline(
+        functools.partial(prefetch_scan_symbol, self.build),
+        functools.partial(collect_scan_snapshot, self.build, self.win_proba),
+        fetch_workers=config.SCAN_FETCH_WORKERS,
+        compute_workers=config.SCAN_COMPUTE_WORKERS,
+        queue_size=config.SCAN_QUEUE_SIZE,
+        initializer=init_scan_worker,
+        initargs=(config.NOW, dict(quotes.prices)),
+      )
+      for symbol, result, error in pipeline.run(self.symbols):
+        if error is not None:
+          print(strformat(symbol, f"Skipping - {error}"))
+          if config.IS_DEBUG:
+            traceback.print_exception(error)
+            raise error
+          continue
+
+        snapshot, stats = result
+        get_stats().merge(stats)
+        if snapshot:
+          yield snapshot
 
   def run(self, side=None):
-    Parallel(n_jobs=config.NUM_PARALLEL_JOBS, require='sharedmem')(delayed(self._run_iter)(symbol) for symbol in self.symbols)
+    for snapshot in self.iter_snapshots():
+      self.figman.add_graph_as_ax(snapshot.graph_roi_vs_expiry)
+      print(strformat(snapshot.symbol, f"Adding subplot (WORTHY_MIN_BID={config.WORTHY_MIN_BID}, WORTHY_MIN_ROI={config.WORTHY_MIN_ROI})\n \"{snapshot.title}\"\n"))
 
 
 class Diver(Runner):
 
   def run(self, side=None):
+    with use_quote_snapshot(self.symbols):
+      self._run(side=side)
+
+  def _run(self, side=None):
+    # Sig levels of a symbol share one loaded strategy.
+    pool = StrategyPool()
+
     for symbol in self.symbols:
 
       self.figman.add_empty_figure(symbol)
 
+      # Fetched once up front as in scans, eg refetching live chains.
+      try:
+        prefetch_scan_symbol(self.build, symbol)
+      except Exception as e:
+        print(strformat(symbol, f"Skipping - {e}"))
+        if config.IS_DEBUG:
+          traceback.print_exc()
+          raise e
+        continue
+
       for sig_level in self.sig_levels:
         try:
           win_proba = get_win_proba(side, self.option_type, sig_level)
-          snapshot = self.build(symbol, win_proba).create_snapshot()
+          with span('compute', symbol=symbol):
+            snapshot = self.build(symbol, win_proba, pool=pool).create_snapshot()
           self.figman.add_graph_as_ax(snapshot.graph_roi_vs_expiry)
           print(strformat(symbol, f"Adding subplot (WORTHY_MIN_BID={config.WORTHY_MIN_BID}, WORTHY_MIN_ROI={config.WORTHY_MIN_ROI})\n \"{snapshot.title}\""))
 
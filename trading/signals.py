@@ -1,3 +1,5 @@
+import numpy as np
+
 from utils import compute_cdf
 
 
@@ -5,22 +7,40 @@ class Signal:
   def __init__(self, *args, weight=1, **kwargs):
     self.weight = weight
 
+  def compute_edges(self, df, max_proba, **kwargs):
+    # Column of edges for all rows. Subclasses vectorize, this is the per-row fallback.
+    return df.apply(lambda row: self.compute_edge(row, max_proba, **kwargs), axis=1).values.astype(float)
+
 
 class SupportSignal(Signal):
 
   def __str__(self):
     raise NotImplementedError
 
+  def get_support_price(self, price_model):
+    raise NotImplementedError
+
   def validate_conditions(self, price, strike):
     return price > self.support_price and strike < self.support_price
 
   def compute_edge(self, row, max_proba, **kwargs):
+    self.support_price = self.get_support_price(kwargs['price_model'])
     price = kwargs['price_model'].get_latest_price()
     strike = row['strike']
     if not self.validate_conditions(price, strike):
       return 0
     return self.weight * max_proba * (price - self.support_price) / (price - strike)
 
+  def compute_edges(self, df, max_proba, **kwargs):
+    self.support_price = self.get_support_price(kwargs['price_model'])
+    price = kwargs['price_model'].get_latest_price()
+    strikes = df['strike'].values
+
+    mask = (price > self.support_price) & (strikes < self.support_price)
+    with np.errstate(divide='ignore', invalid='ignore'):
+      edges = self.weight * max_proba * (price - self.support_price) / (price - strikes)
+    return np.where(mask, edges, 0.0)
+
 
 class MovingAverageSupportSignal(SupportSignal):
   def __init__(self, n, *args, **kwargs):
@@ -30,18 +50,16 @@ class MovingAverageSupportSignal(SupportSignal):
   def __str__(self):
     return "{}_ma_edge".format(self.n)
 
-  def compute_edge(self, row, max_proba, **kwargs):
-    self.support_price = kwargs['price_model'].get_ma(self.n)
-    return super().compute_edge(row, max_proba, **kwargs)
+  def get_support_price(self, price_model):
+    return price_model.get_ma(self.n)
 
 
 class FiftyTwoLowSupportSignal(SupportSignal):
   def __str__(self):
     return '52_low_edge'
 
-  def compute_edge(self, row, max_proba, **kwargs):
-    self.support_price = kwargs['price_model'].get_52_low()
-    return super().compute_edge(row, max_proba, **kwargs)
+  def get_support_price(self, price_model):
+    return price_model.get_52_low()
 
 
 class DeltaSignal(Signal):
@@ -54,6 +72,14 @@ class DeltaSignal(Signal):
     delta = abs(row['delta'])
     return max_proba * (1 - lose_proba / delta) if lose_proba < delta else 0
 
+  def compute_edges(self, df, max_proba, **kwargs):
+    lose_proba = 1 - kwargs['win_proba']
+    # Greeks are stored as float32 so upcast to match compute_edge.
+    deltas = np.abs(df['delta'].values.astype(np.float64))
+    with np.errstate(divide='ignore', invalid='ignore'):
+      edges = max_proba * (1 - lose_proba / deltas)
+    return np.where(lose_proba < deltas, edges, 0.0)
+
 
 class MoveSignal(Signal):
   def __str__(self):
@@ -67,3 +93,7 @@ class MoveSignal(Signal):
     zscore = move / sigma
     phi = compute_cdf(zscore)
     return max_proba * (0.5 - phi) / 0.5 if move < 0 else 0
+
+  def compute_edges(self, df, max_proba, **kwargs):
+    # Edge only depends on the underlying so compute once for all rows.
+    return np.full(len(df), float(self.compute_edge(None, max_proba, **kwargs)))
@@ -0,0 +1,243 @@
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+import config
+
+from datetime import datetime
+
+from utils import MARKET_CLOSE, is_market_hours, is_workday, printout
+
+
+OPTION_TYPES = ['put', 'call']
+
+QUOTE_COLUMNS = ['strike', 'bid', 'ask']
+COUNT_COLUMNS = ['volume', 'open_interest']
+GREEK_COLUMNS = ['delta', 'gamma', 'theta', 'vega', 'rho', 'phi', 'bid_iv', 'mid_iv', 'ask_iv', 'smv_vol']
+
+
+LABEL_COLUMNS = ['description', 'updated_at']
+
+
+def parse_options(options):
+  """
+  Option records, eg as decoded from a chain response, as typed column arrays
+  in record order with greeks unpacked straight into arrays. Missing values are nan.
+  """
+  greeks = [option.get('greeks') or {} for option in options]
+
+  columns = dict(
+    expiration_date=np.array([option['expiration_date'] for option in options], dtype='datetime64[D]'),
+    option_type=np.array([OPTION_TYPES.index(option['option_type']) for option in options], dtype=np.int8),
+  )
+  for colname in QUOTE_COLUMNS:
+    columns[colname] = np.array([option.get(colname) for option in options], dtype=np.float64)
+  for colname in COUNT_COLUMNS:
+    columns[colname] = np.array([option.get(colname) or 0 for option in options], dtype=np.int64)
+  for colname in GREEK_COLUMNS:
+    columns[colname] = np.array([option_greeks.get(colname) for option_greeks in greeks], dtype=np.float64)
+
+  columns['description'] = np.array([option.get('description') for option in options], dtype=object)
+  columns['updated_at'] = np.array([option_greeks.get('updated_at') for option_greeks in greeks], dtype=object)
+  return columns
+
+
+def get_chain_columns(chain):
+  # Chains cached before responses were decoded to columns are lists of option records.
+  return parse_options(chain) if isinstance(chain, list) else chain
+
+
+def concat_chains(chains):
+  """
+  Chains (one per expiry, as columns or records) as column arrays in expiry then record order.
+  """
+  chains = [get_chain_columns(chain) for chain in chains] or [parse_options([])]
+  return {colname: np.concatenate([chain[colname] for chain in chains]) for colname in chains[0]}
+
+
+def chains_to_columns(chains):
+  """
+  Flatten chains (one per expiry) into sorted numeric column arrays.
+  """
+  columns = concat_chains(chains)
+
+  # Sorted so lookups by expiry and strike are binary searches.
+  order = np.lexsort((columns['strike'], columns['option_type'], columns['expiration_date']))
+  return {colname: values[order] for colname, values in columns.items() if colname not in LABEL_COLUMNS}
+
+
+def chains_to_df(chains, greek_dtype=np.float32):
+  """
+  Compact frame of chains (one per expiry) in record order.
+  Option types and greek timestamps are categoricals, greeks are greek_dtype
+  and quotes stay float64 since strikes, ROIs and spread EVs compare them to the cent.
+  """
+  columns = concat_chains(chains)
+
+  return pd.DataFrame({
+    'description': columns['description'],
+    'expiration_date': columns['expiration_date'].astype('datetime64[ns]'),
+    'option_type': pd.Categorical.from_codes(columns['option_type'], OPTION_TYPES),
+    **{colname: columns[colname] for colname in QUOTE_COLUMNS},
+    'volume': columns['volume'],
+    **{colname: columns[colname].astype(greek_dtype) for colname in GREEK_COLUMNS},
+    'updated_at': pd.Categorical(columns['updated_at']),
+  })
+
+
+def get_memory_report(df):
+  """
+  Bytes per column including referenced Python objects, largest first, with a total row.
+  """
+  usage = df.memory_usage(index=True, deep=True)
+  report = pd.DataFrame(dict(
+    dtype=[str(df[colname].dtype) if colname in df else str(df.index.dtype) for colname in usage.index],
+    bytes=usage.values,
+  ), index=usage.index).sort_values('bytes', ascending=False)
+  report.loc['total'] = ['', report['bytes'].sum()]
+  return report
+
+
+class ChainSnapshot:
+  """
+  All expiries of one symbol at one point in time, as memory-mapped columns.
+  """
+
+  def __init__(self, symbol, timestamp, columns):
+    self.symbol = symbol
+    self.timestamp = timestamp
+    self.columns = columns
+
+  def __len__(self):
+    return len(next(iter(self.columns.values())))
+
+  def find(self, expiration_date, option_type, strike=None):
+    """
+    Returns row slice for an expiry and option type, narrowed to an exact strike if given.
+    """
+    expiries = self.columns['expiration_date']
+    expiry = np.datetime64(expiration_date, 'D')
+    lo, hi = np.searchsorted(expiries, expiry, 'left'), np.searchsorted(expiries, expiry, 'right')
+
+    option_types = self.columns['option_type'][lo:hi]
+    type_code = OPTION_TYPES.index(option_type)
+    lo, hi = lo + np.searchsorted(option_types, type_code, 'left'), lo + np.searchsorted(option_types, type_code, 'right')
+
+    if strike is not None:
+      strikes = self.columns['strike'][lo:hi]
+      lo, hi = lo + np.searchsorted(strikes, strike, 'left'), lo + np.searchsorted(strikes, strike, 'right')
+
+    return slice(lo, hi)
+
+  def to_df(self):
+    df = pd.DataFrame(self.columns)
+    df['option_type'] = pd.Categorical.from_codes(df['option_type'], OPTION_TYPES)
+    df['timestamp'] = self.timestamp
+    return df
+
+
+class ChainArchive:
+  """
+  Chain snapshots partitioned as "<root>/<SYMBOL>/<YYYYMMDD>/<HHMM>/<column>.npy".
+  Snapshots after the close are end of day and saved under "eod". Before the open
+  (or on weekends) chains are still those of the last session so go under its "eod".
+  """
+
+  EOD = 'eod'
+
+  def __init__(self, root=None):
+    self.root = root or config.CHAIN_ARCHIVE_DIR
+
+  def _get_partition(self, symbol, timestamp=None):
+    timestamp = timestamp or config.NOW
+    if is_market_hours(timestamp):
+      datestr, timestr = timestamp.strftime('%Y%m%d'), timestamp.strftime('%H%M')
+    elif is_workday(timestamp) and timestamp.time() >= MARKET_CLOSE:
+      datestr, timestr = timestamp.strftime('%Y%m%d'), self.EOD
+    else:
+      session_date = np.busday_offset(np.datetime64(timestamp.date(), 'D'), -1 if is_workday(timestamp) else 0, roll='backward')
+      datestr, timestr = pd.Timestamp(session_date).strftime('%Y%m%d'), self.EOD
+    return os.path.join(self.root, symbol.upper(), datestr, timestr)
+
+  def append(self, symbol, chains, timestamp=None):
+    partition = self._get_partition(symbol, timestamp=timestamp)
+    if os.path.exists(partition):
+      return False
+
+    columns = chains_to_columns(chains)
+
+    # Write all columns to a temp dir then rename so readers never see a partial snapshot.
+    os.makedirs(os.path.dirname(partition), exist_ok=True)
+    tmp_partition = tempfile.mkdtemp(dir=os.path.dirname(partition))
+    try:
+      for colname, values in columns.items():
+        np.save(os.path.join(tmp_partition, colname + '.npy'), values)
+      os.rename(tmp_partition, partition)
+    except OSError:
+      # Another process archived the same snapshot first.
+      shutil.rmtree(tmp_partition, ignore_errors=True)
+      return False
+
+    printout(f"Archived {len(columns['strike'])} options to {partition}")
+    return True
+
+  def iter_snapshots(self, symbol, start_date, end_date=None, columns=None):
+    """
+    Yields ChainSnapshot per partition between the dates (inclusive) in time order.
+    """
+    symbol_dir = os.path.join(self.root, symbol.upper())
+    if not os.path.exists(symbol_dir):
+      return
+
+    start_datestr = pd.Timestamp(start_date).strftime('%Y%m%d')
+    end_datestr = pd.Timestamp(end_date).strftime('%Y%m%d') if end_date else None
+
+    for datestr in sorted(os.listdir(symbol_dir)):
+      if datestr < start_datestr or (end_datestr and datestr > end_datestr):
+        continue
+
+      date_dir = os.path.join(symbol_dir, datestr)
+      # "eod" sorts after all HHMM partitions.
+      for timestr in sorted(os.listdir(date_dir)):
+        partition = os.path.join(date_dir, timestr)
+        if not os.path.isdir(partition) or timestr.startswith('tmp'):
+          continue
+
+        colnames = columns or [filename[:-4] for filename in os.listdir(partition)]
+        snapshot_columns = {
+          colname: np.load(os.path.join(partition, colname + '.npy'), mmap_mode='r')
+          for colname in colnames
+        }
+        timestamp = datetime.strptime(datestr + ('1600' if timestr == self.EOD else timestr), '%Y%m%d%H%M')
+        yield ChainSnapshot(symbol, timestamp, snapshot_columns)
+
+  def read(self, symbol, start_date, end_date=None, columns=None):
+    """
+    Concatenate all snapshots in range into column arrays with a "timestamp" column.
+    """
+    snapshots = list(self.iter_snapshots(symbol, start_date, end_date=end_date, columns=columns))
+    if not snapshots:
+      return dict()
+
+    ret = {
+      colname: np.concatenate([snapshot.columns[colname] for snapshot in snapshots])
+      for colname in snapshots[0].columns
+    }
+    ret['timestamp'] = np.repeat(
+      np.array([snapshot.timestamp for snapshot in snapshots], dtype='datetime64[m]'),
+      [len(snapshot) for snapshot in snapshots],
+    )
+    return ret
+
+
+_archive = None
+
+
+def get_chain_archive():
+  global _archive
+  if _archive is None:
+    _archive = ChainArchive()
+  return _archive
@@ -0,0 +1,131 @@
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+import config
+
+from datetime import timedelta
+
+from constants import DATE_FORMAT
+from utils import printout
+from vendors.tradier import fetch_historical_prices
+
+
+class PriceStore:
+  """
+  Daily bars persisted per symbol as one Fortran ordered .npy so each column
+  is contiguous and can be memory-mapped. Runs only fetch bars after the last
+  stored date (or before the first, when asked for an earlier start).
+  """
+
+  COLUMNS = ['date', 'open', 'high', 'low', 'close', 'volume']
+
+  def __init__(self, root=None, fetch_fn=fetch_historical_prices):
+    self.root = root or config.PRICE_STORE_DIR
+    self.fetch_fn = fetch_fn
+    self._lock = threading.Lock()
+
+  def _get_filepath(self, symbol):
+    return os.path.join(self.root, f'{symbol.upper()}.npy')
+
+  def read(self, symbol):
+    """
+    Returns memory-mapped (n, len(COLUMNS)) array, dates as days since epoch.
+    """
+    filepath = self._get_filepath(symbol)
+    if not os.path.exists(filepath):
+      return np.empty((0, len(self.COLUMNS)), order='F')
+    return np.load(filepath, mmap_mode='r')
+
+  def write(self, symbol, bars):
+    os.makedirs(self.root, exist_ok=True)
+    filepath = self._get_filepath(symbol)
+
+    # Write to temp file then rename so readers never see a partial file.
+    fd, tmp_filepath = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+    try:
+      with os.fdopen(fd, 'wb') as f:
+        np.save(f, np.asfortranarray(bars))
+      os.replace(tmp_filepath, filepath)
+    except BaseException:
+      os.unlink(tmp_filepath)
+      raise
+
+  def _fetch(self, symbol, start_date, end_date):
+    days = self.fetch_fn(symbol, start_date.strftime(DATE_FORMAT), end_date.strftime(DATE_FORMAT))
+    printout(f"Fetched {len(days)} bars for {symbol} from {start_date} to {end_date}.")
+    bars = np.empty((len(days), len(self.COLUMNS)), order='F')
+    if len(days) == 0:
+      return bars
+
+    bars[:, 0] = np.array([day['date'] for day in days], dtype='datetime64[D]').astype(np.int64)
+    for i, colname in enumerate(self.COLUMNS[1:], start=1):
+      bars[:, i] = [day[colname] for day in days]
+
+    # Today's bar is incomplete until the close so never persist it.
+    today = np.datetime64(config.NOW.date(), 'D').astype(np.int64)
+    return bars[bars[:, 0] < today]
+
+  @staticmethod
+  def _to_date(days):
+    return np.datetime64(int(days), 'D').astype(object)
+
+  def update(self, symbol, start_date):
+    start_date = pd.Timestamp(start_date).date()
+    last_complete_date = config.NOW.date() - timedelta(days=1)
+
+    with self._lock:
+      bars = self.read(symbol)
+      new_bars = [bars]
+
+      if len(bars) == 0:
+        new_bars = [self._fetch(symbol, start_date, last_complete_date)]
+
+      else:
+        first_date = self._to_date(bars[0, 0])
+        last_date = self._to_date(bars[-1, 0])
+
+        if start_date < first_date:
+          new_bars.insert(0, self._fetch(symbol, start_date, first_date - timedelta(days=1)))
+
+        # Skip request when no trading day has completed since last stored bar.
+        next_busday = np.busday_offset(np.datetime64(last_date + timedelta(days=1), 'D'), 0, roll='forward')
+        if next_busday.astype(object) <= last_complete_date:
+          new_bars.append(self._fetch(symbol, last_date + timedelta(days=1), last_complete_date))
+
+      if len(new_bars) > 1 or len(bars) == 0:
+        self.write(symbol, np.concatenate(new_bars))
+
+  def load(self, symbol, start_date):
+    self.update(symbol, start_date)
+
+    bars = self.read(symbol)
+    start = np.datetime64(pd.Timestamp(start_date).date(), 'D').astype(np.int64)
+    bars = bars[np.searchsorted(bars[:, 0], start):]
+
+    data = {colname: bars[:, i] for i, colname in enumerate(self.COLUMNS)}
+    data['date'] = bars[:, 0].astype(np.int64).astype('datetime64[D]')
+    data['volume'] = bars[:, -1].astype(np.int64)
+    return pd.DataFrame(data, copy=False)
+
+
+_store = None
+
+
+def get_price_store():
+  global _store
+  if _store is None:
+    _store = PriceStore()
+  return _store
+
+
+def load_historical_prices(symbol, start_date):
+  """
+  Daily bars from start_date through the previous trading day.
+  """
+  if config.PRICE_STORE_DIR is None:
+    return pd.DataFrame(fetch_historical_prices(symbol, start_date))
+  return get_price_store().load(symbol, start_date)
@@ -1,5 +1,6 @@
-import mplcursors
-import matplotlib.dates as mdates
+import copy
+
+import numpy as np
 import pandas as pd
 
 import config
@@ -7,6 +8,9 @@ import config
 from datetime import datetime
 
 from analysis.models import PriceModel
+from instrumentation import timed
+from storage.chains import chains_to_df, get_chain_archive, get_memory_report
+from strategy.strikes import StrikeIndex
 from constants import (
   DATE_FORMAT,
   DELTA_UPPER,
@@ -16,38 +20,45 @@ from constants import (
 )
 from utils import (
   count_trading_days,
-  calc_annual_roi,
+  calc_annual_rois,
   get_win_proba,
   get_target_colname,
-  get_tscore,
-  get_zscore,
+  get_xscores,
+  is_market_hours,
 )
 from vendors.tradier import (
   fetch_options_expirations,
-  fetch_options_chain,
+  fetch_options_chains,
 )
 
 
 class DerivativeStrategyBase:
-  INCLUDE_COLUMNS = [
-    'description',
-    'expiration_date',
-    'option_type',
-    'strike',
-    'bid',
-    'ask',
-    'volume',
-    'greeks',
-  ]
-  
-  def __init__(self, symbol, side=None):
+
+  def __init__(self, symbol, side=None, price_model=None):
     self.symbol = symbol
-    self.price_model = PriceModel(symbol)
+    # Shared model, eg from a StrategyPool, saves reloading prices per strategy.
+    self.price_model = price_model or PriceModel(symbol)
     self.side = side
+    self._snapshots = dict()
   
     self.expiry_dates = pd.to_datetime(fetch_options_expirations(symbol))
     self._load()
 
+  @staticmethod
+  def get_expiry_datestrs(expiry_dates):
+    return [expiry_date.strftime(DATE_FORMAT) for expiry_date in expiry_dates]
+
+  @classmethod
+  def prefetch(cls, symbol):
+    """
+    Fetch what __init__ needs into the shared cache, eg from I/O threads ahead of compute.
+    """
+    PriceModel.prefetch(symbol)
+    expiry_dates = pd.to_datetime(fetch_options_expirations(symbol))
+    # Only prefetch refetches live chains so _load always reads what was fetched here.
+    refresh = is_market_hours() or config.FORCE_REFRESH
+    fetch_options_chains(symbol, cls.get_expiry_datestrs(expiry_dates), refresh=refresh)
+
   def __repr__(self):
     return f"DerivativeStrategyBase(symbol={self.symbol}, side={self.side})"
 
@@ -55,41 +66,70 @@ class DerivativeStrategyBase:
     return str(self.price_model)
 
   def _load(self):
-  
+    chains = fetch_options_chains(self.symbol, self.get_expiry_datestrs(self.expiry_dates))
+    self._set_chains(chains)
+
+  def reload_chains(self):
+    """
+    Re-fetch live chains, eg after the underlying moved, keeping the price model.
+    """
+    chains = fetch_options_chains(self.symbol, self.get_expiry_datestrs(self.expiry_dates), refresh=True)
+    self._set_chains(chains)
+
+  def update_targets(self):
+    """
+    Recompute target strikes from the latest price without touching the chains.
+    """
+    # Target strikes depend on expiry dates so compute (sig level x expiry) surface at once.
+    sig_levels = sorted(T_SIG_LEVELS)
+    trading_dtes = count_trading_days(self.expiry_dates)
+    xscores = get_xscores(sig_levels, trading_dtes - 1)
+    target_surface = self.price_model.predict_price(trading_dtes, xscores)
+    target_colnames = [get_target_colname(sig_level) for sig_level in sig_levels]
+    self.targets_df = pd.DataFrame(target_surface.T, index=self.expiry_dates, columns=target_colnames)
+    self._snapshots = dict()
+
+  @timed('chains')
+  def _set_chains(self, chains):
+
     self.df = None
-    
-    chain_dfs = []
-    # Target strikes depend on expiry dates so concat by expiry date groups.
-    for expiry_date in self.expiry_dates:
-
-      chain = fetch_options_chain(self.symbol, expiry_date.strftime(DATE_FORMAT))
-      # Drop column if all values = nan.
-      chain_df = pd.DataFrame.from_records(chain, columns=self.INCLUDE_COLUMNS).dropna(axis=1, how='all')
-#      chain_df = pd.DataFrame.from_records(chain).dropna(axis=1, how='all')
-
-      if chain_df.empty:
-        continue
-
-      trading_dte = count_trading_days(expiry_date)
-      dof = trading_dte - 1
-      for sig_level in sorted(T_SIG_LEVELS):
-        # T-score does not exist for dof = 0 so default to Normal since sigma is 1 day move anyways.
-        xscore = get_tscore(sig_level, dof) or get_zscore(sig_level)
-        target_strike = self.price_model.predict_price(trading_dte, xscore)
-        colname = get_target_colname(sig_level)
-        chain_df[colname] = target_strike
-
-      chain_dfs.append(chain_df)
-      
-    # Optimization - concat just once at end, otherwise copy created per loop.
-    self.df = pd.concat(chain_dfs, axis=0)
-
-    # Helper columns including unnested greek columns.
-    greeks = pd.json_normalize(self.df['greeks']).set_index(self.df.index)
-    self.df = pd.concat([self.df.drop(columns=['greeks']), greeks], axis=1)
-
-    self.df['yoy_roi'] = self.df.apply(calc_annual_roi, axis=1)
-    self.df['expiration_date'] = pd.to_datetime(self.df['expiration_date'])
+
+    if config.CHAIN_ARCHIVE_DIR is not None:
+      get_chain_archive().append(self.symbol, chains)
+
+    # Targets vary by expiry only so they are joined to selected rows in take_rows rather than stored per row.
+    self.df = chains_to_df(chains)
+    self.update_targets()
+
+    dtes = (self.df['expiration_date'].values.astype('datetime64[D]') - np.datetime64(config.NOW.date(), 'D')).astype(int)
+    self.df['yoy_roi'] = calc_annual_rois(self.df['bid'].values, self.df['strike'].values, dtes)
+
+    # Built once so snapshots at any sig level are binary searches.
+    self.strike_index = StrikeIndex(self.df['expiration_date'].values, self.df['strike'].values)
+    self._option_type_strike_indexes = dict()
+
+  def get_strike_index(self, option_type):
+    # Index of just one option type's rows, eg for spreads where both legs share a type.
+    if option_type not in self._option_type_strike_indexes:
+      positions = np.flatnonzero(self.df['option_type'].values == option_type)
+      self._option_type_strike_indexes[option_type] = StrikeIndex(
+        self.df['expiration_date'].values[positions],
+        self.df['strike'].values[positions],
+        positions=positions,
+      )
+    return self._option_type_strike_indexes[option_type]
+
+  def take_rows(self, positions):
+    """
+    Rows at positions of self.df with their expiry's target strike columns after the quotes.
+    """
+    rows = self.df.iloc[positions]
+    targets = self.targets_df.loc[rows['expiration_date'].values].set_index(rows.index)
+    loc = rows.columns.get_loc('volume') + 1
+    return pd.concat([rows.iloc[:, :loc], targets, rows.iloc[:, loc:]], axis=1)
+
+  def get_memory_report(self):
+    return get_memory_report(self.df)
 
   # TODO (vjw): use @property?
   def get_price_model(self):
@@ -101,7 +141,8 @@ class DerivativeStrategyBase:
   def _prepare_df(self, sig_level, option_type):
     # Capture closest 2 strikes.
     target_colname = get_target_colname(sig_level)
-    graph_df = self.df.groupby(by='expiration_date').apply(lambda x: x.iloc[(abs(x['strike'] - x[target_colname])).argsort()[:2]])
+    targets = self.targets_df.loc[self.strike_index.expiry_dates, target_colname].values
+    graph_df = self.take_rows(self.strike_index.nearest(targets, k=2))
     return graph_df
 
   def _apply_filters(self, graph_df, option_type, expiry_after, expiry_before):
@@ -140,7 +181,18 @@ class DerivativeStrategyBase:
 
     return graph_df
 
+  @timed('snapshot')
   def make_snapshot(self, option_type, sig_level, expiry_after=None, expiry_before=None):
+    """
+    Snapshot of the strikes nearest the sig_level target. Memoized until chains or targets change,
+    returning copies so callers may add columns.
+    """
+    key = (option_type, sig_level, expiry_after, expiry_before)
+    if key not in self._snapshots:
+      self._snapshots[key] = self._make_snapshot(option_type, sig_level, expiry_after=expiry_after, expiry_before=expiry_before)
+    return self._snapshots[key].copy()
+
+  def _make_snapshot(self, option_type, sig_level, expiry_after=None, expiry_before=None):
 
     if option_type not in ('call', 'put'):
       raise ValueError("Invalid option_type: {option_type}")
@@ -183,6 +235,28 @@ class DerivativeStrategySnapshot:
     self.sig_level = sig_level
     self.next_earnings = next_earnings
 
+  OUTPUT_COLUMNS = ['expiration_date', 'option_type', 'strike', 'bid', 'ask', 'delta', 'yoy_roi']
+
+  def copy(self):
+    snapshot = copy.copy(self)
+    snapshot.df = self.df.copy()
+    return snapshot
+
+  def get_output_columns(self):
+    edge_colnames = [colname for colname in self.df.columns if colname.endswith('_edge')]
+    return self.OUTPUT_COLUMNS + edge_colnames
+
+  def to_output_df(self):
+    """
+    One row per option with a fixed schema for streaming output, ie without matplotlib.
+    """
+    df = self.df[self.get_output_columns()].copy()
+    df.insert(0, 'symbol', self.symbol)
+    df.insert(1, 'side', self.side)
+    df.insert(2, 'sig_level', round(self.sig_level, 3))
+    df.insert(df.columns.get_loc('yoy_roi') + 1, 'target', self.df[get_target_colname(self.sig_level)])
+    return df
+
   def _get_tooltip_map(self, xs, ys):
 
     target_colname = get_target_colname(self.sig_level)
@@ -273,6 +347,8 @@ class DerivativeStrategySnapshot:
       return text
 
   def _add_tooltip(self, cursor, tooltip_map):
+    import matplotlib.dates as mdates
+
     @cursor.connect('add')
     def on_add(sel):
       expiry_at = mdates.num2date(sel.target[0]).strftime(DATE_FORMAT)
@@ -283,7 +359,7 @@ class DerivativeStrategySnapshot:
 
       sel.annotation.set(text=text)
 
-  def graph_roi_vs_expiry(self, ax):
+  def graph_roi_vs_expiry(self, ax, interactive=True):
     target_colname = get_target_colname(self.sig_level)
 
     # Graph of ROI vs Expirations.
@@ -310,9 +386,12 @@ class DerivativeStrategySnapshot:
     ax.set_xticks(xticks)
     ax.set_xticklabels(xticklabels, rotation=30)
 
-    cursor = mplcursors.cursor(scatter, hover=True)
-    tooltip_map = self._get_tooltip_map(xs, ys)
-    self._add_tooltip(cursor, tooltip_map)
+    if interactive:
+      # Imported only when someone can hover since it loads slowly.
+      import mplcursors
+      cursor = mplcursors.cursor(scatter, hover=True)
+      tooltip_map = self._get_tooltip_map(xs, ys)
+      self._add_tooltip(cursor, tooltip_map)
     
     yticks = [i/10 for i in range(0, 11)]
     ax.set_yticks(yticks)
@@ -1,4 +1,3 @@
-import matplotlib.dates as mdates
 import numpy as np
 import pandas as pd
 
@@ -6,22 +5,37 @@ import config
 
 from analysis.models import PriceModel
 from constants import COVERED_CALLS, SIDE_SHORT
+from instrumentation import timed
 from strategy.base import DerivativeStrategyBase
 from strategy.credit_spreads import CreditSpreadStrategy
 from utils import get_sig_level
 
 
 class Build:
-  def __init__(self, symbol, win_proba, *args, signals=None, **kwargs):
+  def __init__(self, symbol, win_proba, *args, signals=None, pool=None, **kwargs):
     self.symbol = symbol
     self.win_proba = win_proba
     self._strategy = None
     self.signals = signals or []
+    self.pool = pool
 
   @property
   def strategy(self):
     raise NotImplementedError
 
+  @classmethod
+  def prefetch(cls, symbol):
+    # Fetch the strategy's data into the shared cache so create_snapshot only computes.
+    raise NotImplementedError
+
+  def _get_strategy(self, strategy_class):
+    if self._strategy is None:
+      if self.pool:
+        self._strategy = self.pool.get_strategy(strategy_class, self.symbol, side=self.side)
+      else:
+        self._strategy = strategy_class(self.symbol, side=self.side)
+    return self._strategy
+
   @property
   def price_model(self):
     return self.strategy.get_price_model()
@@ -32,17 +46,21 @@ class Build:
   def create_snapshot(self):
     self.validate_conditions()
     snapshot = self._create_snapshot()
+    self.apply_signals(snapshot)
+    return snapshot
 
-    if self.signals:
-      signal_max_proba = (1 - self.win_proba) / len(self.signals)
-      kwargs = {
-        'win_proba': self.win_proba,
-        'price_model': self.price_model,
-      }
-      for signal in self.signals:
-        snapshot.df[str(signal)] = snapshot.df.apply(lambda row: signal.compute_edge(row, signal_max_proba, **kwargs), axis=1)
+  @timed('signals')
+  def apply_signals(self, snapshot):
+    if not self.signals:
+      return
 
-    return snapshot
+    signal_max_proba = (1 - self.win_proba) / len(self.signals)
+    kwargs = {
+      'win_proba': self.win_proba,
+      'price_model': self.price_model,
+    }
+    for signal in self.signals:
+      snapshot.df[str(signal)] = signal.compute_edges(snapshot.df, signal_max_proba, **kwargs)
 
   def add_signals(self, signals):
     self.signals += signals
@@ -56,9 +74,11 @@ class SellSimplePutBuild(Build):
 
   @property
   def strategy(self):
-    if self._strategy is None:
-      self._strategy = DerivativeStrategyBase(self.symbol, side=self.side)
-    return self._strategy
+    return self._get_strategy(DerivativeStrategyBase)
+
+  @classmethod
+  def prefetch(cls, symbol):
+    DerivativeStrategyBase.prefetch(symbol)
 
   def validate_conditions(self):
     latest_price = self.price_model.get_latest_price()
@@ -80,9 +100,7 @@ class SellSimplePutCreditSpreadBuild(SellSimplePutBuild):
 
   @property
   def strategy(self):
-    if self._strategy is None:
-      self._strategy = CreditSpreadStrategy(self.symbol, side=self.side)
-    return self._strategy
+    return self._get_strategy(CreditSpreadStrategy)
 
 
 ########## DEPRECATED ##########
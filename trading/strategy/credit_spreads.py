@@ -1,5 +1,4 @@
-import mplcursors
-import matplotlib.dates as mdates
+import numpy as np
 import pandas as pd
 
 import config
@@ -30,48 +29,84 @@ class CreditSpreadStrategy(DerivativeStrategyBase):
   def get_snapshot_class(self):
     return CreditSpreadSnapshot
 
-  def _get_long_row_index(self, group_df, short_strike, short_premium, win_proba):
+  def find_spreads(self, sig_level, option_type, num_short_legs=1, top_k=1):
+    """
+    Best spreads per expiry by EV, shorting one of the num_short_legs strikes
+    nearest the target and buying any lower strike. Every (short, long) pair
+    of every expiry is evaluated as one masked EV matrix.
+    Returns top_k spreads per expiry (sorted by expiry then EV) with row
+    positions of both legs in self.df. long_position is -1 when no lower strike exists.
+    """
+    target_colname = get_target_colname(sig_level)
+    win_proba = get_win_proba('short', option_type, sig_level)
+
+    index = self.get_strike_index(option_type)
+    targets = self.targets_df.loc[index.expiry_dates, target_colname].values
+    mids = ((self.df['bid'].values + self.df['ask'].values) / 2)[index.order]
 
-    mid_bid_ask = (group_df['bid'] + group_df['ask']) / 2
+    # Short legs x all rows (sorted by expiry and strike).
+    shorts = index.search(targets, k=num_short_legs)
+    short_strikes = index.strikes[shorts][:, None]
+    short_premiums = mids[shorts][:, None]
+    short_codes = index.codes[shorts]
 
     ev = (
       # win case
-      (win_proba * (short_premium - mid_bid_ask))
+      (win_proba * (short_premiums - mids))
       # TODO: vjw case where short leg itm but long leg otm
       # "lose" case (value already negative)
-      + (1 - win_proba) * ((short_premium - mid_bid_ask) - (short_strike - group_df['strike']))
+      + (1 - win_proba) * ((short_premiums - mids) - (short_strikes - index.strikes))
     ).round(4)
-
-    group_df['ev'] = ev
-    ev_argsort = ev.argsort()
-    return ev_argsort[-1:]
-
-  def _find_best_strikes(self, group_df, short_target_colname, win_proba):
-
-    short_leg_row = group_df.iloc[(abs(group_df['strike'] - group_df[short_target_colname])).argsort()[:1]]
-
-    short_strike = short_leg_row['strike'].values[0]
-    short_premium = (short_leg_row['bid'] + short_leg_row['ask']).values[0] / 2
-
-    long_df = group_df[group_df['strike'] < short_strike]
-    long_leg_row = long_df.iloc[self._get_long_row_index(long_df, short_strike, short_premium, win_proba)]
-
-    ret = pd.concat([short_leg_row.reset_index(drop=True), long_leg_row.reset_index(drop=True)])
-    return ret
+    is_valid = (index.codes == short_codes[:, None]) & (index.strikes < short_strikes)
+    ev = np.where(is_valid, ev, -np.inf)
+
+    # Best longs per short, highest strike first among equal EVs.
+    longs = np.argsort(ev, axis=1, kind='stable')[:, ::-1][:, :top_k]
+    spread_evs = np.take_along_axis(ev, longs, axis=1)
+    spread_codes = np.repeat(short_codes, longs.shape[1])
+    spread_shorts = np.repeat(shorts, longs.shape[1])
+    spread_longs = longs.ravel()
+    spread_evs = spread_evs.ravel()
+
+    # Drop invalid longs but keep one row per short without any lower strike, as with top_k=1.
+    keep = np.isfinite(spread_evs) | (np.arange(len(spread_evs)) % longs.shape[1] == 0)
+    spread_codes, spread_shorts, spread_longs, spread_evs = (
+      spread_codes[keep], spread_shorts[keep], spread_longs[keep], spread_evs[keep]
+    )
+
+    # Keep top_k spreads per expiry across all short legs.
+    order = np.lexsort((-1 * spread_evs, spread_codes))
+    group_starts = np.searchsorted(spread_codes[order], spread_codes[order])
+    order = order[np.arange(len(order)) - group_starts < top_k]
+
+    has_long = np.isfinite(spread_evs[order])
+    return pd.DataFrame({
+      'expiration_date': index.expiry_dates[spread_codes[order]],
+      'short_strike': index.strikes[spread_shorts[order]],
+      'long_strike': np.where(has_long, index.strikes[spread_longs[order]], np.nan),
+      'short_premium': mids[spread_shorts[order]],
+      'long_premium': np.where(has_long, mids[spread_longs[order]], np.nan),
+      'ev': np.where(has_long, spread_evs[order], np.nan),
+      'short_position': index.order[spread_shorts[order]],
+      'long_position': np.where(has_long, index.order[spread_longs[order]], -1),
+    })
 
   def _prepare_df(self, sig_level, option_type):
-    target_colname = get_target_colname(sig_level)
-    win_proba = get_win_proba('short', option_type, sig_level)
+    spreads = self.find_spreads(sig_level, option_type)
 
-    option_type_mask = (self.df['option_type'] == option_type)
-    grouped_df = self.df[option_type_mask].groupby(by='expiration_date')
+    # One row per leg, short then long, with EV on the long leg.
+    positions = np.column_stack([spreads['short_position'], spreads['long_position']]).ravel()
+    evs = np.column_stack([np.full(len(spreads), np.nan), spreads['ev']]).ravel()
+    has_leg = positions >= 0
 
-    graph_df = grouped_df.apply(lambda x: self._find_best_strikes(x, target_colname, win_proba))
+    graph_df = self.take_rows(positions[has_leg]).assign(ev=evs[has_leg])
     return graph_df
 
 
 class CreditSpreadSnapshot(DerivativeStrategySnapshot):
 
+  OUTPUT_COLUMNS = DerivativeStrategySnapshot.OUTPUT_COLUMNS + ['ev']
+
   def _get_tooltip_map(self, xs, ys):
     tooltip_map = super()._get_tooltip_map(xs, ys)
     evs = self.df['ev']
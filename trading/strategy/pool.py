@@ -0,0 +1,23 @@
+from analysis.models import PriceModel
+
+
+class StrategyPool:
+  """
+  Loaded strategies and price models shared by every build in one run, eg so
+  a deep dive over many sig levels loads each symbol's chains once.
+  """
+
+  def __init__(self):
+    self._price_models = dict()
+    self._strategies = dict()
+
+  def get_price_model(self, symbol):
+    if symbol not in self._price_models:
+      self._price_models[symbol] = PriceModel(symbol)
+    return self._price_models[symbol]
+
+  def get_strategy(self, strategy_class, symbol, side=None):
+    key = (strategy_class, symbol, side)
+    if key not in self._strategies:
+      self._strategies[key] = strategy_class(symbol, side=side, price_model=self.get_price_model(symbol))
+    return self._strategies[key]
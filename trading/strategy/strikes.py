@@ -0,0 +1,60 @@
+import numpy as np
+import pandas as pd
+
+
+class StrikeIndex:
+  """
+  Rows sorted by (expiry, strike) so the nearest strikes to a target in
+  every expiry are found with one searchsorted instead of a sort per expiry.
+  """
+
+  def __init__(self, expiration_dates, strikes, positions=None):
+    # positions := row positions in the indexed frame, if only a subset of rows is given
+    strikes = np.asarray(strikes, dtype=float)
+    codes, self.expiry_dates = pd.factorize(expiration_dates, sort=True)
+
+    # Stable so rows with equal strikes (eg put and call) keep their original order.
+    sorted_order = np.lexsort((strikes, codes))
+    self.order = sorted_order if positions is None else np.asarray(positions)[sorted_order]
+    self.codes = codes[sorted_order]
+    self.strikes = strikes[sorted_order]
+
+    ends = np.cumsum(np.bincount(codes, minlength=len(self.expiry_dates)))
+    self.starts = ends - np.bincount(codes, minlength=len(self.expiry_dates))
+    self.ends = ends
+
+    # Offset strikes by expiry so all expiries are searched in one sorted array.
+    self._min_strike = strikes.min() if len(strikes) else 0
+    self._span = (strikes.max() - self._min_strike + 2) if len(strikes) else 1
+    self._keys = self.codes * self._span + (self.strikes - self._min_strike)
+
+  def __len__(self):
+    return len(self.order)
+
+  def nearest(self, targets, k=2):
+    """
+    targets := one target strike per expiry in self.expiry_dates order
+    Returns row positions of the k nearest strikes per expiry, grouped by expiry and ordered by distance.
+    """
+    return self.order[self.search(targets, k=k)]
+
+  def search(self, targets, k=2):
+    """
+    Same as nearest() but returns indices into the sorted arrays (eg self.strikes).
+    """
+    targets = np.asarray(targets, dtype=float)
+    group_codes = np.arange(len(self.expiry_dates))
+    offsets = np.clip(targets - self._min_strike, -1, self._span - 1)
+    positions = np.searchsorted(self._keys, group_codes * self._span + offsets)
+
+    # The k nearest are always within k rows either side of the insertion point.
+    candidates = positions[:, None] + np.arange(-k, k)[None, :]
+    is_valid = (candidates >= self.starts[:, None]) & (candidates < self.ends[:, None])
+    candidates = np.clip(candidates, 0, max(len(self) - 1, 0))
+
+    distances = np.where(is_valid, np.abs(self.strikes[candidates] - targets[:, None]), np.inf)
+    nearest = np.argsort(distances, axis=1, kind='stable')[:, :k]
+
+    selected = np.take_along_axis(candidates, nearest, axis=1)
+    is_selected = np.take_along_axis(is_valid, nearest, axis=1)
+    return selected[is_selected]
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis.indicators import IndicatorPanel
+
+
+@pytest.fixture
+def bars():
+  rng = np.random.default_rng(0)
+  dates = pd.bdate_range('2023-01-02', periods=600).values
+  closes = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 600)))
+  return dates, closes
+
+
+def assert_matches_pandas(panel, closes):
+  closes = pd.Series(closes)
+  changes = np.log(closes / closes.shift(1))
+  sigmas = changes.rolling(20, min_periods=2).std()
+
+  expected = dict(
+    ma_50=closes.rolling(50, min_periods=1).mean(),
+    ma_200=closes.rolling(200, min_periods=1).mean(),
+    high_52=closes.rolling(252, min_periods=1).max(),
+    low_52=closes.rolling(252, min_periods=1).min(),
+    sigma=sigmas,
+    zscore=changes / sigmas.shift(1),
+  )
+  for colname, values in expected.items():
+    np.testing.assert_allclose(panel.get_values(colname), values, rtol=1e-9, equal_nan=True, err_msg=colname)
+
+
+def test_indicator_panel(bars):
+  dates, closes = bars
+  panel = IndicatorPanel(dates, closes)
+
+  assert len(panel) == 600
+  assert_matches_pandas(panel, closes)
+  assert panel.get_ma(200) == pytest.approx(closes[-200:].mean())
+  assert panel.get_ma(37, index=100) == pytest.approx(closes[64:101].mean())
+  assert panel.get_52_low(index=-2) == closes[-253:-1].min()
+  assert panel.get_index(dates[100]) == 100
+  assert panel.get_index(dates[0]) == 0
+  with pytest.raises(KeyError):
+    panel.get_index(dates[0] - np.timedelta64(1, 'D'))
+
+
+def test_indicator_panel_append(bars):
+  dates, closes = bars
+  panel = IndicatorPanel(dates[:10], closes[:10])
+  for date, close in zip(dates[10:], closes[10:]):
+    panel.append(date, close)
+
+  assert len(panel) == 600
+  assert_matches_pandas(panel, closes)
+  assert (panel.get_values('date') == dates).all()
+
+  with pytest.raises(IndexError):
+    panel.get_ma(200, index=600)
@@ -1,11 +1,14 @@
 import pytest
 import config
 
+import numpy as np
+
 from datetime import datetime
 
 from unittest.mock import patch
 
-from analysis.models import PriceModel
+from analysis.models import PriceModel, expand_segments
+from utils import get_tscore
 
 
 class TestModel:
@@ -73,3 +76,21 @@ class TestModel:
     model = PriceModel('FSLY')  # would never invest.
     result = model.start_date
     assert result == '2023-01-01'
+
+  def test_intraquarter_predict_price_accuracies(self, model):
+    days_list = [5, 10]
+    tscores = [get_tscore(0.9, days - 1) for days in days_list]
+    result = model.calc_intraquarter_predict_price_accuracies(days_list, tscores)
+    assert [round(x, 4) for x in result] == [0.9172, 0.9155]
+
+  def test_intraquarter_returns_stay_within_quarters(self, model):
+    result = model.calc_intraquarter_returns([1, 10])
+    starts, ends, _ = model.get_quarter_segments(model.prices_df[model.avoid_earnings_mask])
+    assert len(result[1]) == sum(ends - starts - 1)
+    assert len(result[10]) == sum(ends - starts - 10)
+
+
+def test_expand_segments():
+  positions, segment_ids = expand_segments(np.array([5, 0, 9]), np.array([8, 2, 9]))
+  assert list(positions) == [5, 6, 7, 0, 1]
+  assert list(segment_ids) == [0, 0, 0, 1, 1]
@@ -0,0 +1,26 @@
+import numpy as np
+
+from analysis.models import PriceModel
+from analysis.regime import calc_regime_df, calc_regime_errors, make_start_dates
+from utils import get_tscore
+
+
+def test_make_start_dates():
+  result = make_start_dates('2023-01-01', until='2023-01-31')
+  assert result == ['2023-01-02', '2023-01-09', '2023-01-16', '2023-01-23', '2023-01-30']
+
+
+def test_calc_regime_df_matches_price_model():
+  regime_df = calc_regime_df('NVDA', ['2023-01-01'], dtes=[5, 20], sig_levels=[0.1, 0.3])
+  model = PriceModel('NVDA', start_date='2023-01-01')
+
+  expected = []
+  for dte in [5, 20]:
+    for sig_level in [0.1, 0.3]:
+      targets = model.predict_price(dte, get_tscore(sig_level, dte), model.prices_df['close'])
+      actuals = model.prices_df['close'].shift(-1 * dte)
+      expected.append((actuals <= targets).sum() / len(model.prices_df))
+
+  np.testing.assert_array_equal(regime_df['itm_proba'].values, expected)
+  np.testing.assert_allclose(regime_df['diff'], regime_df['itm_proba'] - regime_df['siglevel'])
+  assert list(calc_regime_errors(regime_df).index) == ['2023-01-01']
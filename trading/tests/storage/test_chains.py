@@ -0,0 +1,101 @@
+import os
+import pickle
+import pytest
+
+import numpy as np
+import pandas as pd
+
+from datetime import datetime
+from unittest.mock import patch
+
+from storage.chains import ChainArchive, chains_to_df, get_memory_report
+
+
+@pytest.fixture
+def chains():
+  chains = []
+  for expiry_datestr in ('2024-10-25', '2024-11-01'):
+    with open(f'tests/saved/20241024/fetch_options_chain-MDB_{expiry_datestr}.pkl', 'rb') as f:
+      chains.append(pickle.load(f))
+  return chains
+
+
+class TestChainArchive:
+
+  def test_append_once_per_partition(self, tmp_path, chains):
+    archive = ChainArchive(root=str(tmp_path))
+    assert archive.append('MDB', chains)
+    assert not archive.append('MDB', chains)
+
+  def test_partition_by_timestamp(self, tmp_path, chains):
+    # Partitioned by the snapshot's own time, not config.NOW.
+    archive = ChainArchive(root=str(tmp_path))
+    archive.append('MDB', chains, timestamp=datetime(2024, 10, 24, 10, 30))
+    archive.append('MDB', chains, timestamp=datetime(2024, 10, 24, 16, 30))
+    assert sorted(os.listdir(tmp_path / 'MDB' / '20241024')) == ['1030', ChainArchive.EOD]
+
+    # Before the open and on weekends chains are still those of the last session.
+    assert archive.append('MDB', chains, timestamp=datetime(2024, 10, 24, 8, 0))
+    assert archive.append('MDB', chains, timestamp=datetime(2024, 10, 26, 10, 30))
+    assert not archive.append('MDB', chains, timestamp=datetime(2024, 10, 28, 8, 0))
+    assert os.listdir(tmp_path / 'MDB' / '20241023') == [ChainArchive.EOD]
+    assert os.listdir(tmp_path / 'MDB' / '20241025') == [ChainArchive.EOD]
+    assert sorted(os.listdir(tmp_path / 'MDB')) == ['20241023', '20241024', '20241025']
+
+  def test_read_round_trip(self, tmp_path, chains):
+    archive = ChainArchive(root=str(tmp_path))
+    archive.append('MDB', chains, timestamp=datetime(2024, 10, 24, 17, 0))
+
+    result = archive.read('MDB', '2024-10-24', '2024-10-24')
+    assert len(result['strike']) == sum(len(chain) for chain in chains)
+    assert set(result['expiration_date'].astype(str)) == {'2024-10-25', '2024-11-01'}
+    assert (result['timestamp'] == np.datetime64('2024-10-24T16:00')).all()
+    assert archive.read('MDB', '2024-10-25') == dict()
+
+  def test_find_by_expiry_and_strike(self, tmp_path, chains):
+    archive = ChainArchive(root=str(tmp_path))
+    archive.append('MDB', chains, timestamp=datetime(2024, 10, 24, 17, 0))
+    snapshot = next(archive.iter_snapshots('MDB', '2024-10-24'))
+
+    expected = next(option for option in chains[1] if option['option_type'] == 'put' and option['strike'] == 250)
+    rows = snapshot.find('2024-11-01', 'put', strike=250)
+    assert rows.stop - rows.start == 1
+    assert snapshot.columns['bid'][rows][0] == expected['bid']
+    assert snapshot.columns['delta'][rows][0] == expected['greeks']['delta']
+
+    rows = snapshot.find('2024-11-01', 'call')
+    assert rows.stop - rows.start == sum(option['option_type'] == 'call' for option in chains[1])
+
+
+class TestChainsToDf:
+
+  def test_typed_columns_in_record_order(self, chains):
+    df = chains_to_df(chains)
+    options = [option for chain in chains for option in chain]
+
+    assert len(df) == len(options)
+    assert df['option_type'].dtype == 'category'
+    assert df['updated_at'].dtype == 'category'
+    assert df['delta'].dtype == np.float32
+    assert df['bid'].dtype == np.float64
+    assert df['expiration_date'].dtype == 'datetime64[ns]'
+
+    expected = pd.json_normalize(options)
+    assert (df['description'] == expected['description']).all()
+    assert (df['option_type'].astype(str) == expected['option_type']).all()
+    np.testing.assert_array_equal(df['strike'], expected['strike'])
+    np.testing.assert_array_equal(df['delta'], expected['greeks.delta'].astype(np.float32))
+
+  def test_memory_report(self, chains):
+    df = chains_to_df(chains)
+    report = get_memory_report(df)
+
+    assert report.loc['total', 'bytes'] == df.memory_usage(deep=True).sum()
+    assert report.loc['delta', 'dtype'] == 'float32'
+
+    # Smaller than the object columns and float64 greeks it replaces.
+    options = [option for chain in chains for option in chain]
+    records = pd.json_normalize(options)[['description', 'expiration_date', 'option_type', 'strike', 'bid', 'ask', 'volume']]
+    greeks = pd.json_normalize([option['greeks'] for option in options])
+    before = pd.concat([records, greeks], axis=1).memory_usage(deep=True).sum()
+    assert report.loc['total', 'bytes'] < before / 2
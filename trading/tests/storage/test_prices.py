@@ -0,0 +1,75 @@
+import pytest
+
+import config
+
+from datetime import datetime
+from unittest.mock import patch
+
+from constants import EASTERN_TZ
+from storage.prices import PriceStore
+
+
+def make_day(datestr, close):
+  return dict(date=datestr, open=close, high=close, low=close, close=close, volume=100)
+
+
+class FakeFetch:
+
+  DAYS = [
+    make_day('2024-10-17', 1.0),
+    make_day('2024-10-18', 2.0),
+    make_day('2024-10-21', 3.0),
+    make_day('2024-10-22', 4.0),
+    make_day('2024-10-23', 5.0),
+    make_day('2024-10-24', 6.0),
+  ]
+
+  def __init__(self):
+    self.calls = []
+
+  def __call__(self, symbol, start_date, end_date):
+    self.calls.append((start_date, end_date))
+    return [day for day in self.DAYS if start_date <= day['date'] <= end_date]
+
+
+class TestPriceStore:
+
+  @pytest.fixture
+  def fetch(self):
+    return FakeFetch()
+
+  @pytest.fixture
+  def store(self, tmp_path, fetch):
+    return PriceStore(root=str(tmp_path), fetch_fn=fetch)
+
+  @patch('config.NOW', datetime(2024, 10, 22, 11, 0, tzinfo=EASTERN_TZ))
+  def test_load_excludes_today(self, store, fetch):
+    df = store.load('MDB', '2024-10-17')
+
+    assert fetch.calls == [('2024-10-17', '2024-10-21')]
+    assert list(df['close']) == [1.0, 2.0, 3.0]
+    assert df['date'].iloc[-1] == datetime(2024, 10, 21)
+
+  def test_load_appends_only_new_bars(self, store, fetch):
+    with patch('config.NOW', datetime(2024, 10, 22, 11, 0, tzinfo=EASTERN_TZ)):
+      store.load('MDB', '2024-10-18')
+      store.load('MDB', '2024-10-18')
+
+    with patch('config.NOW', datetime(2024, 10, 25, 11, 0, tzinfo=EASTERN_TZ)):
+      df = store.load('MDB', '2024-10-17')
+
+    assert fetch.calls == [
+      ('2024-10-18', '2024-10-21'),
+      ('2024-10-17', '2024-10-17'),
+      ('2024-10-22', '2024-10-24'),
+    ]
+    assert list(df['close']) == [1.0, 2.0, 3.0, 4.0, 5.0, 6.0]
+
+  @patch('config.NOW', datetime(2024, 10, 21, 11, 0, tzinfo=EASTERN_TZ))
+  def test_load_skips_fetch_over_weekend(self, store, fetch):
+    with patch('config.NOW', datetime(2024, 10, 19, 11, 0, tzinfo=EASTERN_TZ)):
+      store.load('MDB', '2024-10-17')
+    df = store.load('MDB', '2024-10-18')
+
+    assert fetch.calls == [('2024-10-17', '2024-10-18')]
+    assert list(df['close']) == [2.0]
@@ -17,3 +17,25 @@ class TestCreditSpreadStrategy:
     result = strat.make_snapshot('put', 0.15).df.to_csv()
 
     assert result == snapshot
+
+  def test_find_spreads_top_k(self):
+    strat = CreditSpreadStrategy('MDB', side='short')
+    best = strat.find_spreads(0.15, 'put')
+    result = strat.find_spreads(0.15, 'put', num_short_legs=3, top_k=3)
+
+    assert result.groupby('expiration_date').size().max() <= 3
+    assert not result.duplicated(['expiration_date', 'short_strike', 'long_strike']).any()
+    spreads = result[result['long_position'] >= 0]
+    assert (spreads['long_strike'] < spreads['short_strike']).all()
+    assert spreads.groupby('expiration_date')['ev'].is_monotonic_decreasing.all()
+
+    top_evs = spreads.groupby('expiration_date')['ev'].first()
+    best_evs = best.dropna(subset=['ev']).set_index('expiration_date')['ev']
+    assert (top_evs[best_evs.index] >= best_evs).all()
+
+  def test_find_spreads_top_k_single_short(self):
+    strat = CreditSpreadStrategy('MDB', side='short')
+    result = strat.find_spreads(0.15, 'put', top_k=3)
+
+    # Shorts with fewer than top_k lower strikes yield fewer spreads, not placeholder rows.
+    assert not result.duplicated(['expiration_date', 'short_strike', 'long_strike']).any()
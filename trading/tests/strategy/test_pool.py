@@ -0,0 +1,47 @@
+import pandas as pd
+
+from graphing import FigureManager
+from instrumentation import collect
+from runners import PutDiver
+from strategy.builds import SellSimplePutCreditSpreadBuild, SellSimplePutBuild
+from strategy.credit_spreads import CreditSpreadStrategy
+from strategy.pool import StrategyPool
+
+from constants import SIDE_SHORT
+
+
+class TestStrategyPool:
+
+  def test_shared_strategies(self):
+    pool = StrategyPool()
+    builds = [SellSimplePutBuild('MDB', win_proba, pool=pool) for win_proba in (0.85, 0.9, 0.95)]
+    spread_build = SellSimplePutCreditSpreadBuild('MDB', 0.9, pool=pool)
+
+    assert builds[0].strategy is builds[1].strategy is builds[2].strategy
+    assert isinstance(spread_build.strategy, CreditSpreadStrategy)
+    assert spread_build.strategy is not builds[0].strategy
+    assert spread_build.price_model is builds[0].price_model
+
+  def test_memoized_snapshot_copies(self):
+    strategy = StrategyPool().get_strategy(CreditSpreadStrategy, 'MDB', side=SIDE_SHORT)
+
+    snapshot = strategy.make_snapshot('put', 0.25)
+    snapshot.df['move_edge'] = 0.0
+    repeat = strategy.make_snapshot('put', 0.25)
+    assert 'move_edge' not in repeat.df
+    assert repeat.df is not snapshot.df
+    assert strategy._snapshots
+
+    # Memo is cleared once targets change.
+    strategy.update_targets()
+    assert not strategy._snapshots
+    pd.testing.assert_frame_equal(strategy.make_snapshot('put', 0.25).df, repeat.df)
+
+  def test_put_diver_loads_once(self):
+    diver = PutDiver(SellSimplePutBuild, FigureManager(), ['MDB'])
+    with collect() as stats:
+      diver.run(side=SIDE_SHORT)
+
+    assert stats.get_stages()['chains']['calls'] == 1
+    assert stats.get_stages()['price_model']['calls'] == 1
+    assert len(diver.figman.figures['MDB']) == len(diver.sig_levels)
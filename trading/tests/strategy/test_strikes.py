@@ -0,0 +1,33 @@
+import numpy as np
+import pandas as pd
+
+from strategy.strikes import StrikeIndex
+
+
+class TestStrikeIndex:
+
+  def test_nearest_per_expiry(self):
+    expiration_dates = pd.to_datetime(['2024-11-01'] * 4 + ['2024-10-25'] * 3).values
+    strikes = [120, 100, 110, 130, 100, 105, 110]
+    index = StrikeIndex(expiration_dates, strikes)
+
+    # Targets in expiry order: 2024-10-25 then 2024-11-01.
+    result = index.nearest([109, 126], k=2)
+
+    assert list(result) == [6, 5, 3, 0]
+
+  def test_target_outside_strikes(self):
+    expiration_dates = pd.to_datetime(['2024-10-25'] * 2 + ['2024-11-01'] * 2).values
+    index = StrikeIndex(expiration_dates, [100, 110, 100, 110])
+
+    result = index.nearest([1000, -5], k=1)
+
+    assert list(result) == [1, 2]
+
+  def test_small_expiry(self):
+    expiration_dates = pd.to_datetime(['2024-10-25', '2024-11-01', '2024-11-01']).values
+    index = StrikeIndex(expiration_dates, [100, 100, 110])
+
+    result = index.nearest(np.array([100, 104]), k=2)
+
+    assert list(result) == [0, 1, 2]
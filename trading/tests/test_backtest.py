@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from backtest import (
+  calc_calibration_table,
+  calc_earnings_overlaps,
+  calc_historical_itm_probas,
+  calc_panel_itm_probas,
+  calc_regime_stats,
+)
+
+
+def test_calc_earnings_overlaps():
+  dates = np.array(['2024-01-01', '2024-01-04', '2024-01-06', '2024-01-10'], dtype='datetime64[ns]')
+  expiry_dates = np.array(['2024-01-04', '2024-01-08', '2024-01-10', '2024-01-20'], dtype='datetime64[ns]')
+  earnings_dates = np.array(['2024-01-15', '2024-01-04'], dtype='datetime64[ns]')
+
+  result = calc_earnings_overlaps(dates, expiry_dates, earnings_dates)
+  assert result.tolist() == [True, True, False, True]
+
+
+def test_calc_historical_itm_probas():
+  prices = dict(
+    date=pd.bdate_range('2024-01-01', periods=6),
+    close=[10, 11, 9, 12, 8, 10],
+  )
+  earnings_dates = [pd.Timestamp('2024-01-04')]
+
+  df = calc_historical_itm_probas(prices, earnings_dates, 0, 0, [1, 2], [0])
+
+  # With no drift nor volatility the target is today's close.
+  calls = df[df['contract_type'] == 'c']
+  puts = df[df['contract_type'] == 'p']
+  assert calls['num_samples'].tolist() == [3, 1]
+  assert calls['itm_proba'].tolist() == [2 / 3, 0]
+  assert puts['itm_proba'].tolist() == [1 / 3, 1]
+
+  table = calc_calibration_table(df.assign(symbol='XYZ'))
+  assert table.loc[('c', 1), 0] == 0.667
+
+
+def test_calc_panel_itm_probas_matches_per_symbol():
+  dates = pd.bdate_range('2024-01-01', periods=6)
+  prices = dict(
+    XYZ=dict(date=dates, close=[10, 11, 9, 12, 8, 10]),
+    ABC=dict(date=dates[:4], close=[20, 19, 21, 22]),
+  )
+  earnings_dates = dict(XYZ=[pd.Timestamp('2024-01-04')], ABC=[pd.Timestamp('2024-01-02')])
+
+  panel_df = pd.concat([pd.DataFrame(prices[symbol]).assign(symbol=symbol) for symbol in prices], ignore_index=True)
+  earnings_df = pd.DataFrame([dict(symbol=symbol, date=date) for symbol, dates in earnings_dates.items() for date in dates])
+  stats = calc_regime_stats(panel_df, earnings_df)
+  panel_df = panel_df.join(stats, on='symbol')
+
+  # Stacking symbols neither leaks holding periods nor earnings across them.
+  df = calc_panel_itm_probas(panel_df, earnings_df, [1, 2, 3], [-1, 0, 1])
+  for symbol in prices:
+    expected = calc_historical_itm_probas(
+      prices[symbol], earnings_dates[symbol], stats.loc[symbol, 'mu'], stats.loc[symbol, 'sigma'], [1, 2, 3], [-1, 0, 1]
+    )
+    result = df[df['symbol'] == symbol].drop(columns='symbol').reset_index(drop=True)
+    pd.testing.assert_frame_equal(result, expected)
@@ -0,0 +1,30 @@
+import json
+
+import cache
+import config
+
+from benchmarks import scan
+
+
+def test_scan_benchmarks(tmp_path, monkeypatch):
+  monkeypatch.setattr(config, 'CACHE_DIR', config.CACHE_DIR)
+  monkeypatch.setattr(config, 'SCAN_COMPUTE_WORKERS', config.SCAN_COMPUTE_WORKERS)
+  monkeypatch.setattr(config, 'TRADIER_MAX_QUOTE_SYMBOLS', config.TRADIER_MAX_QUOTE_SYMBOLS)
+  monkeypatch.setattr(cache, '_cache', cache._cache)
+  monkeypatch.setenv('TRADING_CACHE_DIR', config.CACHE_DIR)
+
+  outfile = tmp_path / 'bench.json'
+  scan.main(['-n', '2', '-e', '3', '-r', '1', '-w', '0', '-o', str(outfile)])
+
+  with open(outfile) as f:
+    output = json.load(f)
+
+  assert output['num_symbols'] == 2
+  assert output['chain_bytes'] > 0
+  assert set(output['results']) == set(scan.STAGES)
+  assert all(result['runs'] >= 1 and result['min'] > 0 for result in output['results'].values())
+  assert output['results']['load']['runs'] == 2
+
+  lines = scan.compare(output, output).splitlines()[1:]
+  assert [line.split()[0] for line in lines] == scan.STAGES
+  assert all(line.endswith('1.00') for line in lines)
@@ -0,0 +1,110 @@
+import pickle
+
+from unittest.mock import patch
+
+from cache import (
+  MISSING,
+  MemoryCache,
+  PickleDirCache,
+  SqliteCache,
+  TieredCache,
+)
+from decorators import cached
+
+
+class TestMemoryCache:
+
+  def test_evicts_least_recently_used(self):
+    cache = MemoryCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is MISSING
+    assert cache.get('c') == 3
+
+
+class TestPickleDirCache:
+
+  def test_reads_legacy_layout(self, tmp_path):
+    (tmp_path / '20241024').mkdir()
+    with open(tmp_path / '20241024' / 'fetch_latest_price-MDB.pkl', 'wb') as f:
+      pickle.dump(260.96, f)
+
+    cache = PickleDirCache(str(tmp_path))
+    assert cache.get('20241024/fetch_latest_price-MDB') == 260.96
+    assert cache.get('20241024/fetch_latest_price-NVDA') is MISSING
+
+  def test_set_creates_dir(self, tmp_path):
+    cache = PickleDirCache(str(tmp_path))
+    cache.set('20241025/fetch_latest_price-MDB', None)
+
+    assert cache.get('20241025/fetch_latest_price-MDB') is None
+    assert [x.name for x in (tmp_path / '20241025').iterdir()] == ['fetch_latest_price-MDB.pkl']
+
+
+class TestSqliteCache:
+
+  def test_round_trip(self, tmp_path):
+    cache = SqliteCache(str(tmp_path / 'cache.sqlite3'))
+    cache.set('20241024/fetch_options_expirations-MDB', ['2024-10-25'])
+
+    # Another instance (eg another process) shares the same file.
+    other = SqliteCache(str(tmp_path / 'cache.sqlite3'))
+    assert other.get('20241024/fetch_options_expirations-MDB') == ['2024-10-25']
+    assert other.get('20241024/fetch_options_expirations-NVDA') is MISSING
+
+  def test_evicts_to_size_budget(self, tmp_path):
+    value = 'x' * 1000
+    cache = SqliteCache(str(tmp_path / 'cache.sqlite3'), max_bytes=2500)
+    for i in range(5):
+      cache.set(f'key{i}', value)
+
+    assert cache.get_size() <= 2500
+    assert cache.get('key0') is MISSING
+    assert cache.get('key4') == value
+
+  def test_evicts_least_recently_used(self, tmp_path):
+    value = 'x' * 1000
+    cache = SqliteCache(str(tmp_path / 'cache.sqlite3'), max_bytes=2500)
+    with patch('cache.time.time', side_effect=[0, 100, 200, 230, 300]):
+      cache.set('key0', value)
+      cache.set('key1', value)
+      assert cache.get('key0') == value  # touched at 200
+      assert cache.get('key0') == value  # within resolution so not touched
+      cache.set('key2', value)
+
+    assert cache.get('key1') is MISSING
+    assert cache.get('key0') == value
+    assert cache.get('key2') == value
+
+
+class TestTieredCache:
+
+  def test_promotes_disk_hit_to_memory(self, tmp_path):
+    disk = PickleDirCache(str(tmp_path))
+    disk.set('20241024/fetch_latest_price-MDB', 260.96)
+    memory = MemoryCache()
+
+    cache = TieredCache(memory, disk)
+    assert cache.get('20241024/fetch_latest_price-MDB') == 260.96
+    assert memory.get('20241024/fetch_latest_price-MDB') == 260.96
+
+
+def test_cached_refresh():
+  cache = MemoryCache()
+  calls = []
+
+  @cached()
+  def fetch_quote(symbol):
+    calls.append(symbol)
+    return len(calls)
+
+  with patch('decorators.get_cache', lambda: cache):
+    assert fetch_quote('MDB') == 1
+    assert fetch_quote('MDB') == 1
+    assert fetch_quote.refresh('MDB') == 2
+    assert fetch_quote('MDB') == 2
+  assert calls == ['MDB', 'MDB']
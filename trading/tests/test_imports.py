@@ -0,0 +1,47 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+# Modules only some code paths need, eg plotting only when rendering.
+LAZY_MODULES = ['matplotlib', 'mplcursors', 'scipy', 'vectorbt', 'joblib']
+
+# Cumulative import times in seconds, only checked with CHECK_IMPORT_TIMES=1 as they depend on the machine.
+CHECK_IMPORT_TIMES = os.environ.get('CHECK_IMPORT_TIMES') == '1'
+IMPORT_TIME_BUDGETS = dict(
+  main=0.25,
+  runners=1.5,
+  backtest=1.5,
+)
+
+
+def run_python(code, *flags):
+  return subprocess.run(
+    [sys.executable, *flags, '-c', code],
+    capture_output=True,
+    text=True,
+    check=True,
+    env=dict(os.environ, ENV='test'),
+  )
+
+
+@pytest.mark.parametrize('module', IMPORT_TIME_BUDGETS.keys())
+def test_lazy_imports(module):
+  code = f"import sys, {module}; print(','.join(m for m in {LAZY_MODULES} if m in sys.modules))"
+  result = run_python(code)
+
+  assert result.stdout.strip() == ''
+
+
+@pytest.mark.skipif(not CHECK_IMPORT_TIMES, reason='set CHECK_IMPORT_TIMES=1 to check import time budgets')
+@pytest.mark.parametrize('module', IMPORT_TIME_BUDGETS.keys())
+def test_import_time_budget(module):
+  result = run_python(f"import {module}", '-X', 'importtime')
+
+  # Last line is the requested module with its cumulative time in microseconds.
+  last_line = result.stderr.strip().splitlines()[-1]
+  seconds = int(last_line.split('|')[1]) / 1e6
+  print(f"{module}: {seconds:.3f}s (budget {IMPORT_TIME_BUDGETS[module]}s)")
+  assert seconds < IMPORT_TIME_BUDGETS[module]
@@ -0,0 +1,60 @@
+import pickle
+import threading
+
+from instrumentation import Stats, collect, get_stats, incr, span, timed
+
+
+def test_span_symbols():
+  with collect() as stats:
+    with span('compute', symbol='MDB'):
+      with span('signals'):
+        pass
+    with span('render'):
+      pass
+
+  assert set(stats.timings) == {('compute', 'MDB'), ('signals', 'MDB'), ('render', None)}
+  assert stats.timings[('compute', 'MDB')][1] >= stats.timings[('signals', 'MDB')][1]
+  assert stats.get_symbols().keys() == {'MDB'}
+  assert stats.get_stages()['render']['calls'] == 1
+
+
+def test_collect_isolated():
+  process_stats = get_stats()
+  before = dict(process_stats.counters)
+
+  with collect() as stats:
+    incr('cache_hit:fetch_options_chain')
+
+    # Threads record into the process wide stats.
+    thread = threading.Thread(target=incr, args=('threaded',))
+    thread.start()
+    thread.join()
+
+  assert dict(stats.counters) == {'cache_hit:fetch_options_chain': 1}
+  assert process_stats.counters['threaded'] == before.get('threaded', 0) + 1
+  assert process_stats.counters.get('cache_hit:fetch_options_chain', 0) == before.get('cache_hit:fetch_options_chain', 0)
+
+
+def test_merge_pickled():
+
+  @timed('load')
+  def load():
+    incr('cache_hit:fetch_options_chain')
+    incr('cache_miss:fetch_options_chain', 3)
+
+  with collect() as stats:
+    load()
+    load()
+
+  # As sent back from a worker process.
+  merged = Stats()
+  merged.merge(pickle.loads(pickle.dumps(stats)))
+  merged.merge(stats)
+
+  assert merged.get_stages()['load']['calls'] == 4
+  assert merged.get_cache_ratios() == {'fetch_options_chain': 0.25}
+  assert set(merged.to_dict()) == {'stages', 'symbols', 'counters', 'cache_ratios'}
+
+  summary = merged.format_summary()
+  assert 'load' in summary
+  assert 'fetch_options_chain' in summary
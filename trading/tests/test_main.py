@@ -1,12 +1,20 @@
+import copy
+import json
 import os
+import pickle
 import pytest
 
+import cache
+
 import config
 
+from unittest.mock import patch
+
 from strategy.builds import SellSimplePutCreditSpreadBuild, SellSimplePutBuild
 from runners import Scanner, PutDiver
 
-from graphing import FigureManager
+from graphing import FigureManager, render_figure_file, split_by_symbol
+from writers import write_snapshots
 
 from constants import SIDE_SHORT
 
@@ -27,6 +35,85 @@ class TestMain:
     scanner.run()
     figman.render()
 
+  def test_scan_stream(self, tickers, figman, tmp_path):
+    build = SellSimplePutCreditSpreadBuild
+    scanner = Scanner(build, figman, win_proba=config.MY_WIN_PROBA, symbols=tickers)
+    filepath = tmp_path / 'scan.ndjson'
+    write_snapshots(scanner.iter_snapshots(), 'ndjson', filepath=filepath)
+
+    rows = [json.loads(line) for line in filepath.read_text().splitlines()]
+    assert rows
+    assert {row['symbol'] for row in rows} == {'MDB'}
+    assert {'strike', 'bid', 'yoy_roi', 'ev', 'delta_edge'} <= set(rows[0])
+
+  def test_scan_render_to_files(self, tickers, figman, tmp_path):
+    build = SellSimplePutCreditSpreadBuild
+    scanner = Scanner(build, figman, win_proba=config.MY_WIN_PROBA, symbols=tickers)
+    scanner.run()
+
+    filepaths = figman.render_to_files(str(tmp_path), fmt='png', max_workers=1)
+    assert filepaths == [str(tmp_path / 'SellSimplePutCreditSpreadBuild.png')]
+    assert os.path.getsize(filepaths[0]) > 0
+
+    # Same as each worker does, in process so the patch applies.
+    graphs = figman.figures['SellSimplePutCreditSpreadBuild']
+    with patch('mplcursors.cursor', side_effect=AssertionError('no tooltips when headless')):
+      filepath = render_figure_file('scan', graphs, str(tmp_path / 'scan.svg'))
+    assert os.path.getsize(filepath) > 0
+
+  def test_scan_render_splits_symbols(self, tickers, figman, tmp_path):
+    scanner = Scanner(SellSimplePutCreditSpreadBuild, figman, win_proba=config.MY_WIN_PROBA, symbols=tickers)
+    snapshot = next(scanner.iter_snapshots())
+    other = copy.copy(snapshot)
+    other.symbol = 'NVDA'
+
+    graphs = [(snapshot.graph_roi_vs_expiry, (), {}), (other.graph_roi_vs_expiry, (), {})]
+    assert [title for title, _ in split_by_symbol('scan', graphs)] == ['scan_MDB', 'scan_NVDA']
+    assert split_by_symbol('MDB', graphs[:1]) == [('MDB', graphs[:1])]
+
+    # Graphs without tooltips are drawn without interactive.
+    graphs = [(snapshot.graph_roi_vs_expiry, (), {}), (lambda ax: ax.plot([0, 1]), (), {})]
+    filepath = render_figure_file('mixed', graphs, str(tmp_path / 'mixed.png'))
+    assert os.path.getsize(filepath) > 0
+
+  @pytest.mark.parametrize('ncols', [1, 2])
+  def test_draw_figure_grid(self, ncols):
+    graph = (lambda ax: ax.plot([0, 1]), (), {})
+    with patch('graphing.FIG_NCOLS', ncols):
+      single = FigureManager._draw_figure('single', [graph], interactive=False)
+      triple = FigureManager._draw_figure('triple', [graph] * 3, interactive=False)
+
+    assert len(single.axes) == 1
+    assert len(triple.axes) == 3 if ncols == 1 else 4
+
+  def test_scan_fetches_chains_once_in_market_hours(self, tickers, figman, monkeypatch):
+    calls = []
+
+    def make_api_request(endpoint, params, **kwargs):
+      calls.append((endpoint.rsplit('/', 1)[-1], params.get('expiration')))
+      if endpoint.endswith('/chains'):
+        with open(f"tests/saved/20241024/fetch_options_chain-{params['symbol']}_{params['expiration']}.pkl", 'rb') as f:
+          return {'options': {'option': pickle.load(f)}}
+      with open(f"tests/saved/20241024/fetch_latest_price-{params['symbols']}.pkl", 'rb') as f:
+        return {'quotes': {'quote': {'symbol': params['symbols'], 'last': pickle.load(f)}}}
+
+    class FixtureCache(cache.TieredCache):
+      # Intraday entries stay in memory rather than land among the saved fixtures.
+      def set(self, key, value):
+        self.memory.set(key, value)
+
+    monkeypatch.setattr('strategy.base.is_market_hours', lambda: True)
+    monkeypatch.setattr(config, 'SCAN_COMPUTE_WORKERS', 0)
+    monkeypatch.setattr(cache, '_cache', FixtureCache(cache.MemoryCache(), cache.PickleDirCache(config.CACHE_DIR)))
+
+    with patch('vendors.tradier.make_api_request', side_effect=make_api_request):
+      Scanner(SellSimplePutCreditSpreadBuild, figman, win_proba=config.MY_WIN_PROBA, symbols=tickers).run()
+
+    # Live chains are refetched by prefetch only, once per expiry.
+    chain_calls = [expiry_date for endpoint, expiry_date in calls if endpoint == 'chains']
+    assert chain_calls
+    assert len(chain_calls) == len(set(chain_calls))
+
   @pytest.mark.skip()
   def test_deep_dive_puts_success(self, tickers, figman):
     build = SellSimplePutBuild
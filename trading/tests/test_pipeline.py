@@ -0,0 +1,43 @@
+import pytest
+import threading
+
+from pipeline import Pipeline
+
+
+def square(x):
+  if x < 0:
+    raise ValueError(f"negative {x}")
+  return x * x
+
+
+@pytest.mark.parametrize('compute_workers', [0, 2])
+def test_pipeline(compute_workers):
+  fetched = []
+  lock = threading.Lock()
+
+  def fetch(x):
+    if x == 3:
+      raise IOError('fetch failed')
+    with lock:
+      fetched.append(x)
+
+  pipeline = Pipeline(fetch, square, fetch_workers=3, compute_workers=compute_workers, queue_size=2)
+  results = {item: (result, error) for item, result, error in pipeline.run([1, 2, 3, 4, -5])}
+
+  assert sorted(fetched) == [-5, 1, 2, 4]
+  assert results[1] == (1, None)
+  assert results[4] == (16, None)
+  assert results[3][0] is None and isinstance(results[3][1], IOError)
+  assert results[-5][0] is None and isinstance(results[-5][1], ValueError)
+
+
+def test_pipeline_bounded_queue():
+  fetched = []
+  pipeline = Pipeline(fetched.append, square, fetch_workers=1, compute_workers=0, queue_size=1)
+
+  results = pipeline.run(range(100))
+  next(results)
+  # Fetches stay within the queue of the first computed item.
+  assert len(fetched) <= 3
+  results.close()
+  assert len(fetched) <= 4
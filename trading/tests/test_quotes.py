@@ -0,0 +1,35 @@
+from unittest.mock import patch
+
+from analysis.models import PriceModel
+from quotes import QuoteSnapshot, get_quote_snapshot, use_quote_snapshot
+
+
+class TestQuoteSnapshot:
+
+  @patch('quotes.fetch_latest_prices', return_value={'MDB': 260.96, 'NVDA': 139.56})
+  def test_prime_batches_symbols(self, mock_fetch):
+    quotes = QuoteSnapshot()
+    quotes.prime(['MDB', 'NVDA', 'MDB'])
+
+    mock_fetch.assert_called_once_with('MDB,NVDA')
+    assert quotes.get('MDB') == 260.96
+    assert quotes.get('TSLA') is None
+
+  @patch('quotes.fetch_latest_prices')
+  @patch('quotes.fetch_latest_price', return_value=260.96)
+  def test_prime_single_symbol(self, mock_fetch_one, mock_fetch_many):
+    quotes = QuoteSnapshot()
+    quotes.prime(['MDB'])
+
+    mock_fetch_one.assert_called_once_with('MDB')
+    mock_fetch_many.assert_not_called()
+    assert quotes.get('MDB') == 260.96
+
+  @patch('quotes.fetch_latest_price', return_value=1.23)
+  def test_use_quote_snapshot_serves_price_model(self, _):
+    model = PriceModel('MDB')
+    with use_quote_snapshot(['MDB']):
+      assert model.get_latest_price() == 1.23
+
+    assert get_quote_snapshot().get('MDB') is None
+    assert model.get_latest_price() != 1.23
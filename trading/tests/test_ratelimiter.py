@@ -0,0 +1,73 @@
+import pytest
+
+from ratelimiter import PRIORITY_HIGH, PRIORITY_LOW, TokenBucket
+
+
+class FakeClock:
+  def __init__(self):
+    self.now = 1000.0
+
+  def __call__(self):
+    return self.now
+
+  def sleep(self, seconds):
+    self.now += seconds
+
+
+class TestTokenBucket:
+
+  @pytest.fixture
+  def clock(self):
+    return FakeClock()
+
+  @pytest.fixture
+  def filepath(self, tmp_path):
+    return str(tmp_path / 'throttle.json')
+
+  def make_bucket(self, filepath, clock, **kwargs):
+    return TokenBucket(filepath, 10, 60, clock=clock, sleep=clock.sleep, **kwargs)
+
+  def test_burst_then_wait(self, filepath, clock):
+    bucket = self.make_bucket(filepath, clock)
+    for _ in range(10):
+      bucket.acquire(priority=PRIORITY_HIGH)
+    assert clock.now == 1000.0
+
+    bucket.acquire(priority=PRIORITY_HIGH)
+    assert clock.now > 1000.0
+
+  def test_window_caps_calls_per_period(self, filepath, clock):
+    bucket = self.make_bucket(filepath, clock)
+    for _ in range(10):
+      bucket.acquire(priority=PRIORITY_HIGH)
+
+    # Bucket refilled but all calls still in window.
+    clock.now += 30
+    assert bucket.try_acquire(priority=PRIORITY_HIGH) == pytest.approx(30)
+
+  def test_low_priority_leaves_reserve(self, filepath, clock):
+    bucket = self.make_bucket(filepath, clock)
+    for _ in range(5):
+      assert bucket.try_acquire(priority=PRIORITY_LOW) == 0
+    assert bucket.try_acquire(priority=PRIORITY_LOW) > 0
+    assert bucket.try_acquire(priority=PRIORITY_HIGH) == 0
+
+  def test_resets_unreadable_state(self, filepath, clock):
+    # Eg a process killed mid write.
+    with open(filepath, 'w') as f:
+      f.write('{"tokens": 3, "upd')
+
+    bucket = self.make_bucket(filepath, clock)
+    assert bucket.try_acquire() == 0
+    assert bucket.get_usage()['calls'] == 1
+
+  def test_state_shared_across_instances(self, filepath, clock):
+    bucket = self.make_bucket(filepath, clock)
+    other = self.make_bucket(filepath, clock)
+    for _ in range(3):
+      bucket.acquire()
+    other.acquire()
+
+    usage = bucket.get_usage()
+    assert usage['calls'] == 4
+    assert usage['tokens'] == 6
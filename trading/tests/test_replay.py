@@ -0,0 +1,83 @@
+import json
+import pytest
+import requests
+
+import config
+
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from unittest.mock import Mock, patch
+
+from ratelimiter import TokenBucket
+from vendors.replay import ReplayServer, save_recording
+from vendors.tradier import fetch_latest_price, get_retry_after, make_api_request
+
+
+class SequenceRandom:
+  def __init__(self, values):
+    self.values = list(values)
+
+  def random(self):
+    return self.values.pop(0) if self.values else 1.0
+
+
+class TestReplayServer:
+
+  @pytest.fixture(autouse=True)
+  def rate_limiter(self, tmp_path):
+    # Own bucket so tests neither spend nor wait on the shared throttle file.
+    bucket = TokenBucket(str(tmp_path / 'throttle.json'), config.TRADIER_THROTTLE_RATE, config.TRADIER_THROTTLE_PERIOD, burst=config.TRADIER_THROTTLE_BURST)
+    with patch('vendors.tradier.get_rate_limiter', return_value=bucket):
+      yield bucket
+
+  @pytest.fixture
+  def record_dir(self, tmp_path):
+    body = json.dumps({'quotes': {'quote': {'symbol': 'MDB', 'last': 260.96}}})
+    save_recording(str(tmp_path), 'https://api.tradier.com/v1/markets/quotes', {'symbols': 'MDB', 'greeks': 'false'}, 200, body)
+    return str(tmp_path)
+
+  @pytest.fixture
+  def server(self, record_dir):
+    server = ReplayServer(record_dir, retry_after=0)
+    server.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+  def test_replays_recording(self, server):
+    with patch('config.TRADIER_BASE_URL', server.base_url):
+      assert fetch_latest_price.__wrapped__('MDB') == 260.96
+
+  def test_missing_recording(self, server):
+    response = requests.get(f'{server.base_url}/v1/markets/quotes', params={'symbols': 'NVDA'})
+    assert response.status_code == 404
+
+  def test_retries_injected_429(self, server):
+    server.error_rate = 0.5
+    server.random = SequenceRandom([0.0, 0.0, 0.9])
+    endpoint = f'{server.base_url}/v1/markets/quotes'
+    params = {'symbols': 'MDB', 'greeks': 'false'}
+
+    assert make_api_request(endpoint, params)['quotes']['quote']['last'] == 260.96
+
+    server.random = SequenceRandom([0.0] * (config.TRADIER_MAX_RETRIES + 1))
+    with pytest.raises(requests.HTTPError):
+      make_api_request(endpoint, params)
+
+  def test_records_responses(self, server, tmp_path):
+    record_dir = str(tmp_path / 'recorded')
+    with patch('config.TRADIER_RECORD_DIR', record_dir):
+      make_api_request(f'{server.base_url}/v1/markets/quotes', {'symbols': 'MDB', 'greeks': 'false'})
+
+    replay = ReplayServer(record_dir)
+    assert len(replay.recordings) == 1
+    replay.server_close()
+
+
+def test_retry_after():
+  retry_at = datetime.now(timezone.utc) + timedelta(seconds=30)
+
+  assert get_retry_after(Mock(headers={'Retry-After': '5'}), 0) == 5
+  assert 25 < get_retry_after(Mock(headers={'Retry-After': format_datetime(retry_at, usegmt=True)}), 0) <= 30
+  assert get_retry_after(Mock(headers={'Retry-After': 'soon'}), 2) == 4
+  assert get_retry_after(Mock(headers={}), 3) == 8
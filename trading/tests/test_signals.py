@@ -166,3 +166,24 @@ class TestSignalsComputeEdge:
 
     assert result_df.to_csv() == snapshot
     assert result1 == 0.0186  # Only DeltaSignal is nonzero
+
+
+class TestSignalsComputeEdges:
+
+  @pytest.mark.parametrize('signal', [
+    MoveSignal(),
+    DeltaSignal(),
+    FiftyTwoLowSupportSignal(weight=0.5),
+    MovingAverageSupportSignal(200, weight=0.5),
+  ], ids=str)
+  @patch('strategy.builds.SellSimplePutBuild.validate_conditions', lambda self: True)
+  def test_matches_compute_edge(self, signal):
+    build = SellSimplePutBuild('OKTA', config.MY_WIN_PROBA)
+    df = build.create_snapshot().df
+    max_proba = 1 - config.MY_WIN_PROBA
+    kwargs = dict(win_proba=config.MY_WIN_PROBA, price_model=build.price_model)
+
+    result = signal.compute_edges(df, max_proba, **kwargs)
+    expected = [signal.compute_edge(row, max_proba, **kwargs) for _, row in df.iterrows()]
+
+    assert list(result) == expected
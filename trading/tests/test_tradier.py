@@ -1,3 +1,6 @@
+import pickle
+
+import numpy as np
 import pandas as pd
 
 import config
@@ -5,7 +8,8 @@ import config
 from datetime import date
 from unittest.mock import patch
 
-from vendors.tradier import fetch_next_earnings_date
+from storage.chains import OPTION_TYPES, chains_to_df
+from vendors.tradier import fetch_next_earnings_date, fetch_options_chain, fetch_options_chains
 from constants import DATE_FORMAT
 
 
@@ -20,3 +24,28 @@ def test_get_next_earnings_date_is_today():
     result = fetch_next_earnings_date(symbol)
     actual = pd.Timestamp(today)
     assert result == actual
+
+
+def test_fetch_options_chains_preserves_order():
+  expiry_dates = ['2024-11-01', '2024-10-25', '2024-11-08']
+  with patch('vendors.tradier.fetch_options_chain', lambda symbol, expiry_date: [{'symbol': symbol, 'expiration_date': expiry_date}]):
+    result = fetch_options_chains('MDB', expiry_dates)
+    assert [chain[0]['expiration_date'] for chain in result] == expiry_dates
+
+
+def test_fetch_options_chain_columns():
+  with open('tests/saved/20241024/fetch_options_chain-MDB_2024-11-01.pkl', 'rb') as f:
+    options = pickle.load(f)
+  response = {'options': {'option': options[::-1]}}
+
+  with patch('vendors.tradier.make_api_request', return_value=response):
+    chain = fetch_options_chain.__wrapped__('MDB', '2024-11-01')
+    puts = fetch_options_chain.__wrapped__('MDB', '2024-11-01', option_type='put', target_price=250, plus_minus=10)
+
+  # Same frame as from the records cached before responses were decoded to columns.
+  expected = sorted(options[::-1], key=lambda option: option['strike'])
+  pd.testing.assert_frame_equal(chains_to_df([chain]), chains_to_df([expected]))
+
+  assert (puts['option_type'] == OPTION_TYPES.index('put')).all()
+  assert (np.abs(puts['strike'] - 250) < 10).all()
+  assert list(puts['strike']) == sorted(option['strike'] for option in options if option['option_type'] == 'put' and abs(option['strike'] - 250) < 10)
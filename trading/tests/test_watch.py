@@ -0,0 +1,83 @@
+import pandas as pd
+import pytest
+
+import config
+
+from datetime import datetime
+from unittest.mock import patch
+
+from quotes import get_quote_snapshot
+from runners import make_scan_signals
+from strategy.builds import SellSimplePutCreditSpreadBuild
+from vendors import tradier
+from watch import Watcher
+
+
+def make_clock(*hhmms):
+  times = iter([datetime(2024, 10, 24, hh, mm, tzinfo=config.EASTERN_TIMEZONE) for hh, mm in hhmms])
+  return lambda: next(times)
+
+
+@pytest.fixture
+def live():
+  # Live quotes and chains are served from the saved fixtures.
+  prices = []
+  reloaded = []
+
+  def refresh_chain(symbol, expiry_date, **kwargs):
+    reloaded.append(expiry_date)
+    return tradier.fetch_options_chain(symbol, expiry_date, **kwargs)
+
+  quotes = get_quote_snapshot()
+  previous_prices = dict(quotes.prices)
+
+  # Watcher moves the clock so restore it for other tests.
+  with patch('config.NOW', config.NOW), \
+      patch.object(tradier.fetch_latest_price, 'refresh', side_effect=lambda symbol: prices.pop(0)), \
+      patch.object(tradier.fetch_options_chain, 'refresh', side_effect=refresh_chain):
+    yield prices, reloaded
+
+  quotes.prices = previous_prices
+
+
+def test_watch_cycles(live):
+  prices, reloaded = live
+  price = tradier.fetch_latest_price('MDB')
+  prices.extend([price, price, price * 0.998, price * 0.97])
+
+  build = SellSimplePutCreditSpreadBuild
+  clock = make_clock((10, 0), (10, 1), (10, 2), (10, 3))
+  watcher = Watcher(build, ['MDB'], win_proba=config.MY_WIN_PROBA, clock=clock)
+
+  counts = []
+  for i in range(4):
+    snapshots = list(watcher.cycle())
+    counts.append(len(snapshots))
+
+    if i == 0:
+      # First load fetches live chains once rather than read any cached earlier today.
+      assert reloaded and len(reloaded) == len(set(reloaded))
+      reloaded.clear()
+
+    if i == 2:
+      # Small move only updates targets but matches a cold build at that price.
+      assert reloaded == []
+      expected = build('MDB', config.MY_WIN_PROBA, signals=make_scan_signals()).create_snapshot()
+      pd.testing.assert_frame_equal(snapshots[0].df, expected.df)
+
+  # Unchanged quote yields nothing and a big move re-fetches chains.
+  assert counts == [1, 0, 1, 1]
+  assert len(reloaded) > 0
+
+
+def test_watch_stops_after_close(live):
+  prices, _ = live
+  prices.extend([tradier.fetch_latest_price('MDB')] * 2)
+
+  sleeps = []
+  clock = make_clock((15, 58), (15, 59), (15, 59), (16, 1))
+  watcher = Watcher(SellSimplePutCreditSpreadBuild, ['MDB'], interval=60, clock=clock, sleep=sleeps.append)
+
+  snapshots = list(watcher.run())
+  assert len(snapshots) == 1
+  assert len(sleeps) == 1
@@ -0,0 +1,71 @@
+import io
+import json
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+
+from strategy.base import DerivativeStrategySnapshot
+from writers import make_snapshot_writer, write_snapshots
+
+
+def make_snapshot(symbol, strikes):
+  df = pd.DataFrame(dict(
+    expiration_date=pd.to_datetime(['2024-11-01'] * len(strikes)),
+    option_type='put',
+    strike=strikes,
+    bid=1.0,
+    ask=1.2,
+    delta=-0.1,
+    yoy_roi=0.2,
+    move_edge=0.01,
+  ))
+  df['0.1_target'] = 100.0
+  df['theta'] = np.nan
+  return DerivativeStrategySnapshot(symbol, df, 'short', 'put', 0.1)
+
+
+def test_ndjson_writer():
+  f = io.StringIO()
+  writer = make_snapshot_writer('ndjson', f)
+  writer.write(make_snapshot('MDB', [95.0, 90.0]))
+  writer.write(make_snapshot('NVDA', [120.0]))
+
+  rows = [json.loads(line) for line in f.getvalue().splitlines()]
+  assert [(row['symbol'], row['strike']) for row in rows] == [('MDB', 95.0), ('MDB', 90.0), ('NVDA', 120.0)]
+  assert rows[0]['expiration_date'] == '2024-11-01T00:00:00'
+  assert rows[0]['target'] == 100.0
+  assert rows[0]['move_edge'] == 0.01
+  assert 'theta' not in rows[0]
+
+
+def test_csv_writer():
+  f = io.StringIO()
+  writer = make_snapshot_writer('csv', f)
+  writer.write(make_snapshot('MDB', [95.0]))
+  writer.write(make_snapshot('NVDA', [120.0]))
+
+  lines = f.getvalue().splitlines()
+  assert lines[0] == 'symbol,side,sig_level,expiration_date,option_type,strike,bid,ask,delta,yoy_roi,target,move_edge'
+  assert lines[1].startswith('MDB,short,0.1,2024-11-01,put,95.0,')
+  assert lines[2].startswith('NVDA,')
+  assert len(lines) == 3
+
+
+def test_write_snapshots_to_stdout(capfd):
+  def snapshots():
+    print('main process noise')
+    # Eg a spawned scan worker, which writes to fd 1 directly.
+    subprocess.run([sys.executable, '-c', "print('worker noise')"], check=True)
+    yield make_snapshot('MDB', [95.0])
+
+  write_snapshots(snapshots(), 'ndjson')
+  print('after')
+
+  out, err = capfd.readouterr()
+  lines = out.splitlines()
+  assert json.loads(lines[0])['symbol'] == 'MDB'
+  assert lines[1:] == ['after']
+  assert 'main process noise' in err
+  assert 'worker noise' in err
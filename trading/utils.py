@@ -1,7 +1,6 @@
 import os
 import math
 import numpy as np
-import scipy.stats as stats
 
 import config
 
@@ -51,13 +50,25 @@ def get_tscore(a, dof):
   # NOTE: Assumes underlying distribution is normal.
   if dof == 0:
     return None
+  from scipy import stats
   return stats.t.ppf(a, dof)
 
 
 def get_zscore(phi):
+  from scipy import stats
   return stats.norm.ppf(phi)
 
 
+def get_xscores(sig_levels, dofs):
+  # Vectorized get_tscore with (sig levels x dofs) result.
+  # T-score does not exist for dof = 0 so default to Normal since sigma is 1 day move anyways.
+  from scipy import stats
+  sig_levels = np.asarray(sig_levels, dtype=float)[:, None]
+  dofs = np.asarray(dofs)[None, :]
+  tscores = stats.t.ppf(sig_levels, np.where(dofs == 0, 1, dofs))
+  return np.where(dofs == 0, stats.norm.ppf(sig_levels), tscores)
+
+
 def get_target_colname(sig_level, suffix='target'):
   return f"{round(sig_level, 3)}_{suffix}"
 
@@ -66,8 +77,9 @@ def is_weekend():
   return config.NOW.weekday() in (5, 6)
 
 
-def is_workday():
-  return config.NOW.weekday() in (0, 1, 2, 3, 4)
+def is_workday(now=None):
+  now = now or config.NOW
+  return now.weekday() in (0, 1, 2, 3, 4)
 
 
 def is_before_market_hours():
@@ -78,13 +90,15 @@ def is_after_market_hours():
   return MARKET_CLOSE < config.NOW.time() and is_workday()
 
 
-def is_market_hours():
-  return MARKET_OPEN < config.NOW.time() < MARKET_CLOSE and is_workday()
+def is_market_hours(now=None):
+  now = now or config.NOW
+  return MARKET_OPEN < now.time() < MARKET_CLOSE and is_workday(now)
 
 
 def count_trading_days(expiry_on):
+  # expiry_on := date or array-like of dates
   start = np.datetime64(config.NOW.date(), 'D')
-  end = np.datetime64(expiry_on + timedelta(days=1), 'D')
+  end = np.asarray(expiry_on + timedelta(days=1), dtype='datetime64[D]')
   
   trading_dte = np.busday_count(start, end)
   return trading_dte
@@ -101,6 +115,12 @@ def calc_annual_roi(contract) -> float:
   return annual_roi
 
 
+def calc_annual_rois(bids, strikes, dtes):
+  # Vectorized calc_annual_roi.
+  rois = bids / strikes
+  return np.where(dtes > 0, rois * 365 / np.where(dtes > 0, dtes, 1), rois * 365)
+
+
 def printout(s=''):
   if not config.IS_VERBOSE:
     return
@@ -111,7 +131,8 @@ def calc_target_price(current_price, mu, sigma, n, xscore):
   # xscore := either tscore or zscore
   # Mean is linear with n.
   # Sigma is linear with sqrt(n).
-  target_price = current_price * math.exp(n*mu + xscore*math.sqrt(n)*sigma)
+  # Works elementwise on arrays too.
+  target_price = current_price * np.exp(n*mu + xscore*np.sqrt(n)*sigma)
   return target_price
 
 
@@ -125,4 +146,5 @@ def read_earnings_dates_from_csv(symbol):
 
 
 def compute_cdf(zscore):
+  from scipy import stats
   return stats.norm.cdf(zscore)
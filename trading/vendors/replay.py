@@ -0,0 +1,144 @@
+"""
+Record real Tradier responses and replay them from a local stand-in server.
+
+Record while running normally:
+$ TRADIER_RECORD_DIR=recordings poetry run python main.py scan -t mdb
+
+Replay with 50ms latency and 5% of requests rate limited:
+$ poetry run python -m vendors.replay -d recordings -l 0.05 -e 0.05 -p 8765
+$ TRADIER_BASE_URL=http://127.0.0.1:8765 poetry run python main.py scan -t mdb
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qsl, urlparse
+
+
+def make_recording_key(path, params):
+  # None params are never sent so must not change the key.
+  items = sorted((str(k), str(v)) for k, v in (params or {}).items() if v is not None)
+  return hashlib.sha1(json.dumps([path, items]).encode()).hexdigest()
+
+
+def save_recording(record_dir, endpoint, params, status, body):
+  os.makedirs(record_dir, exist_ok=True)
+  path = urlparse(endpoint).path
+  recording = dict(path=path, params=params, status=status, body=body)
+
+  filepath = os.path.join(record_dir, make_recording_key(path, params) + '.json')
+  fd, tmp_filepath = tempfile.mkstemp(dir=record_dir, suffix='.tmp')
+  with os.fdopen(fd, 'w') as f:
+    json.dump(recording, f)
+  os.replace(tmp_filepath, filepath)
+
+
+def load_recordings(record_dir):
+  recordings = dict()
+  for filename in os.listdir(record_dir):
+    if not filename.endswith('.json'):
+      continue
+    with open(os.path.join(record_dir, filename)) as f:
+      recording = json.load(f)
+    recordings[make_recording_key(recording['path'], recording['params'])] = recording
+  return recordings
+
+
+class ReplayHandler(BaseHTTPRequestHandler):
+
+  def _send(self, status, body, headers=None):
+    payload = body.encode()
+    self.send_response(status)
+    self.send_header('Content-Type', 'application/json')
+    self.send_header('Content-Length', str(len(payload)))
+    for k, v in (headers or {}).items():
+      self.send_header(k, v)
+    self.end_headers()
+    self.wfile.write(payload)
+
+  def do_GET(self):
+    server = self.server
+    url = urlparse(self.path)
+    params = dict(parse_qsl(url.query))
+
+    server.sleep_latency()
+
+    if server.should_rate_limit():
+      self._send(429, json.dumps({'fault': {'faultstring': 'Rate limit exceeded'}}), headers={'Retry-After': str(server.retry_after)})
+      return
+
+    recording = server.recordings.get(make_recording_key(url.path, params))
+    if recording is None:
+      self._send(404, json.dumps({'fault': {'faultstring': f'No recording for {self.path}'}}))
+      return
+
+    self._send(recording['status'], recording['body'])
+
+  def log_message(self, format, *args):
+    if self.server.verbose:
+      super().log_message(format, *args)
+
+
+class ReplayServer(ThreadingHTTPServer):
+  """
+  Serves recorded responses with configurable latency and 429 injection.
+  """
+
+  daemon_threads = True
+
+  def __init__(self, record_dir, host='127.0.0.1', port=0, latency=0, jitter=0, error_rate=0, retry_after=0, seed=None, verbose=False):
+    super().__init__((host, port), ReplayHandler)
+    self.recordings = load_recordings(record_dir)
+    self.latency = latency
+    self.jitter = jitter
+    self.error_rate = error_rate
+    self.retry_after = retry_after
+    self.verbose = verbose
+    self.random = random.Random(seed)
+    self._random_lock = threading.Lock()
+
+  @property
+  def base_url(self):
+    host, port = self.server_address[:2]
+    return f'http://{host}:{port}'
+
+  def sleep_latency(self):
+    delay = self.latency
+    if self.jitter:
+      with self._random_lock:
+        delay += self.jitter * self.random.random()
+    if delay > 0:
+      time.sleep(delay)
+
+  def should_rate_limit(self):
+    with self._random_lock:
+      return self.random.random() < self.error_rate
+
+  def start(self):
+    thread = threading.Thread(target=self.serve_forever, daemon=True)
+    thread.start()
+    return thread
+
+
+if __name__ == '__main__':
+  parser = argparse.ArgumentParser()
+  parser.add_argument('-d', '--record-dir', required=True)
+  parser.add_argument('-p', '--port', type=int, default=8765)
+  parser.add_argument('-l', '--latency', type=float, default=0, help='seconds added to every response')
+  parser.add_argument('-j', '--jitter', type=float, default=0, help='max random seconds added on top of latency')
+  parser.add_argument('-e', '--error-rate', type=float, default=0, help='fraction of requests answered with 429')
+  parser.add_argument('-s', '--seed', type=int)
+  parser.add_argument('-v', '--verbose', action='store_true')
+
+  args = parser.parse_args()
+
+  server = ReplayServer(args.record_dir, port=args.port, latency=args.latency, jitter=args.jitter,
+                        error_rate=args.error_rate, seed=args.seed, verbose=args.verbose)
+  print(f"Replaying {len(server.recordings)} recordings at {server.base_url}")
+  server.serve_forever()
@@ -2,83 +2,205 @@ import os
 import requests
 import statistics
 import json
+import threading
+import time
+import numpy as np
 import pandas as pd
 
 import config
 
-from ratelimit import limits, sleep_and_retry
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from urllib.parse import urlparse
 from urllib3.exceptions import MaxRetryError, NewConnectionError
 
 from datetime import datetime
+from email.utils import parsedate_to_datetime
 from pandas.core.common import not_none
-from utils import is_market_hours
+from ratelimiter import PRIORITY_NORMAL, get_rate_limiter
+from utils import is_market_hours, printout
 from constants import DATE_FORMAT
 from decorators import cached
+from storage.chains import OPTION_TYPES, parse_options
+from instrumentation import incr, record
+from vendors.replay import save_recording
+
+# orjson decodes large chain payloads several times faster when installed.
+try:
+  from orjson import loads as json_loads
+except ImportError:
+  from json import loads as json_loads
 
 
 TRADIER_API_KEY = os.environ['TRADIER_API_KEY']
 
+_session = None
+_executor = None
+_lock = threading.Lock()
+
+
+def get_session():
+  # One keep-alive connection pool shared by every thread.
+  global _session
+  with _lock:
+    if _session is None:
+      adapter = HTTPAdapter(pool_connections=1, pool_maxsize=config.TRADIER_POOL_SIZE)
+      _session = requests.Session()
+      _session.mount('https://', adapter)
+      _session.mount('http://', adapter)
+      _session.headers.update({'Authorization': f'Bearer {TRADIER_API_KEY}', 'Accept': 'application/json'})
+    return _session
+
+
+def get_executor():
+  # Shared so concurrent callers (eg Scanner threads) cannot oversubscribe the connection pool.
+  global _executor
+  with _lock:
+    if _executor is None:
+      _executor = ThreadPoolExecutor(max_workers=config.TRADIER_POOL_SIZE, thread_name_prefix='tradier')
+    return _executor
+
+
+def get_retry_after(response, attempt):
+  """
+  Seconds to wait before retrying a 429, from Retry-After as seconds or an HTTP date, else backing off exponentially.
+  """
+  retry_after = response.headers.get('Retry-After')
+  if retry_after is None:
+    return 2 ** attempt
+  try:
+    return float(retry_after)
+  except ValueError:
+    pass
+  try:
+    retry_at = parsedate_to_datetime(retry_after)
+  except (TypeError, ValueError):
+    return 2 ** attempt
+  return max((retry_at - datetime.now(retry_at.tzinfo)).total_seconds(), 0)
+
 
-@sleep_and_retry
-@limits(calls=config.TRADIER_THROTTLE_RATE, period=config.TRADIER_THROTTLE_PERIOD)
-def make_api_request(endpoint, params):
+def make_api_request(endpoint, params, priority=PRIORITY_NORMAL):
   response = None
+  path = urlparse(endpoint).path
+  started_at = time.perf_counter()
   try:
-    response = requests.get(
-      endpoint,
-      params=params,
-      headers={'Authorization': f'Bearer {TRADIER_API_KEY}', 'Accept': 'application/json'}
-    )
+    for attempt in range(config.TRADIER_MAX_RETRIES + 1):
+      get_rate_limiter().acquire(priority=priority)
+      response = get_session().get(
+        endpoint,
+        params=params,
+        timeout=config.TRADIER_TIMEOUT,
+      )
+      if response.status_code != 429:
+        break
+
+      # Quota exceeded anyways (eg by another client) so back off.
+      incr(f"api_retry:{path}")
+      wait = get_retry_after(response, attempt)
+      printout(f"Rate limited by {endpoint} - retrying in {wait}s")
+      time.sleep(wait)
+
     if config.IS_DEBUG or config.IS_VERBOSE:
       print('Exception response header:\n', response.headers)
-    json_response = response.json()
+    if response.status_code == 429:
+      response.raise_for_status()
+
+    if config.TRADIER_RECORD_DIR:
+      save_recording(config.TRADIER_RECORD_DIR, endpoint, params, response.status_code, response.text)
+
+    json_response = json_loads(response.content)
     return json_response
   except Exception as e:
+    incr(f"api_error:{path}")
     raise e
+  finally:
+    # Per endpoint, including rate limit waits and retries.
+    record(f"api:{path}", time.perf_counter() - started_at)
 
 
 @cached(use_time=is_market_hours())
 def fetch_latest_price(symbol: str) -> float:
   # Will pull current price or last close.
-  endpoint = 'https://api.tradier.com/v1/markets/quotes'
+  endpoint = f'{config.TRADIER_BASE_URL}/v1/markets/quotes'
   params = {'symbols': symbol, 'greeks': 'false'}
   return make_api_request(endpoint, params)['quotes']['quote']['last']
 
 
+@cached(use_time=is_market_hours())
+def fetch_latest_prices(symbols: str) -> dict:
+  # symbols := comma separated, eg "MDB,NVDA"
+  endpoint = f'{config.TRADIER_BASE_URL}/v1/markets/quotes'
+  params = {'symbols': symbols, 'greeks': 'false'}
+  quotes = make_api_request(endpoint, params)['quotes'].get('quote', [])
+
+  # Response is a single object rather than a list when only one symbol matched.
+  if isinstance(quotes, dict):
+    quotes = [quotes]
+
+  return {quote['symbol']: quote['last'] for quote in quotes}
+
+
 @cached()
 def fetch_historical_prices(symbol, start_date, end_date = None):
-  endpoint = 'https://api.tradier.com/v1/markets/history'
+  endpoint = f'{config.TRADIER_BASE_URL}/v1/markets/history'
   params = {'symbol': symbol, 'interval': 'daily', 'start': start_date, 'end': end_date, 'session_filter': 'open'}
-  return make_api_request(endpoint, params)['history']['day']
+  history = make_api_request(endpoint, params)['history']
+
+  # Response has no history for empty ranges and a single object rather than a list for one day.
+  if not history:
+    return []
+  days = history['day']
+  return [days] if isinstance(days, dict) else days
 
 
 @cached()
 def fetch_options_expirations(symbol):
-  endpoint = 'https://api.tradier.com/v1/markets/options/expirations'
+  endpoint = f'{config.TRADIER_BASE_URL}/v1/markets/options/expirations'
   params = {'symbol': symbol, 'includeAllRoots': 'true', 'strikes': 'false'}
   return make_api_request(endpoint, params)['expirations']['date']
 
 
-@cached(force_refresh=is_market_hours() or config.FORCE_REFRESH, use_time=is_market_hours())
+# Keyed by day so compute, even in another process, reads what prefetch fetched (see DerivativeStrategyBase.prefetch).
+@cached()
 def fetch_options_chain(symbol, expiry_date, option_type=None, target_price=None, plus_minus=0):
-  endpoint = 'https://api.tradier.com/v1/markets/options/chains'
+  """
+  Options of one expiry sorted by strike, as column arrays (see storage.chains.parse_options).
+  """
+  endpoint = f'{config.TRADIER_BASE_URL}/v1/markets/options/chains'
   params = {'symbol': symbol, 'expiration': expiry_date, 'greeks': 'true'}
-  chain = make_api_request(endpoint, params)['options']['option']
+  options = make_api_request(endpoint, params)['options']['option']
+
+  # Response is a single object rather than a list when only one option matched.
+  if isinstance(options, dict):
+    options = [options]
+  chain = parse_options(options)
+  strikes = chain['strike']
 
-  max_chain_strike = chain[-1]['strike']
+  max_chain_strike = strikes.max(initial=0)
   if target_price and plus_minus and max_chain_strike < (target_price - plus_minus):
     print(f'Warning: Max strike {max_chain_strike} out of range for {expiry_date} target: {target_price}')
-    return []
+    return parse_options([])
 
+  mask = np.ones(len(strikes), dtype=bool)
   if target_price:
-    chain = [option for option in chain if abs(option['strike'] - target_price) < plus_minus]
+    mask &= np.abs(strikes - target_price) < plus_minus
 
   if option_type:
-    chain = [option for option in chain if option['option_type'] == option_type]
+    mask &= chain['option_type'] == OPTION_TYPES.index(option_type)
+
+  positions = np.flatnonzero(mask)
+  positions = positions[np.argsort(strikes[positions], kind='stable')]
+  return {colname: values[positions] for colname, values in chain.items()}
+
 
-  chain = sorted(chain, key=lambda option: option['strike'])
-  
-  return chain
+def fetch_options_chains(symbol, expiry_dates, refresh=False, **kwargs):
+  """
+  Fetch the chains of all expiry dates concurrently, still throttled by make_api_request.
+  Returns chains in the same order as expiry_dates. Skips the cache if refresh.
+  """
+  fetch_fn = fetch_options_chain.refresh if refresh else fetch_options_chain
+  futures = [get_executor().submit(fetch_fn, symbol, expiry_date, **kwargs) for expiry_date in expiry_dates]
+  return [future.result() for future in futures]
 
 
 @cached()
@@ -88,7 +210,7 @@ def fetch_earnings_dates(symbol, after:str=None):
     earnings_dates = read_earnings_dates_from_csv(symbol)
     return earnings_dates
 
-  endpoint = 'https://api.tradier.com/beta/markets/fundamentals/calendars'
+  endpoint = f'{config.TRADIER_BASE_URL}/beta/markets/fundamentals/calendars'
   params = {'symbols': symbol}
   resp = make_api_request(endpoint, params)[0]['results']
 
@@ -130,7 +252,7 @@ def fetch_next_earnings_date(symbol, after=config.REGIME_START_DATE_DEFAULT):
 
 
 def fetch_valuation_ratios(symbol):
-  endpoint = 'https://api.tradier.com/beta/markets/fundamentals/ratios'
+  endpoint = f'{config.TRADIER_BASE_URL}/beta/markets/fundamentals/ratios'
   params = {'symbols': symbol}
   response = make_api_request(endpoint, params)
   return response
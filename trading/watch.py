@@ -0,0 +1,117 @@
+import time
+import traceback
+
+import numpy as np
+
+import config
+
+from datetime import datetime
+
+from quotes import get_quote_snapshot
+from runners import make_scan_signals
+from utils import is_market_hours, strformat
+
+
+class WatchedSymbol:
+  """
+  A symbol's build (and so its loaded strategy) kept in memory between cycles.
+  """
+
+  def __init__(self, build):
+    self.build = build
+    self.quote_price = None  # as of last snapshot
+    self.chain_price = None  # as of last chain fetch
+
+
+class Watcher:
+  """
+  Long running scan during market hours. Models and chains stay in memory and
+  each cycle only refreshes quotes, re-fetches chains of symbols that moved
+  more than move_threshold since their last fetch, and rebuilds snapshots of
+  symbols whose quote changed.
+  """
+
+  def __init__(self, build, symbols, win_proba=config.MY_WIN_PROBA, interval=config.WATCH_INTERVAL,
+               move_threshold=config.WATCH_MOVE_THRESHOLD, clock=None, sleep=time.sleep):
+    self.build = build
+    self.symbols = list(symbols)
+    self.win_proba = win_proba
+    self.interval = interval
+    self.move_threshold = move_threshold
+    self._clock = clock or (lambda: datetime.now(config.EASTERN_TIMEZONE))
+    self._sleep = sleep
+    self.watched = dict()
+
+  def _tick(self):
+    # Dtes, cache keys and market hours all read config.NOW.
+    config.NOW = self._clock()
+
+  def _update(self, symbol, price):
+    watched = self.watched.get(symbol)
+
+    if watched is None:
+      # Live chains rather than any cached earlier today, see DerivativeStrategyBase.prefetch.
+      self.build.prefetch(symbol)
+      watched = WatchedSymbol(self.build(symbol, self.win_proba, signals=make_scan_signals()))
+      watched.build.strategy  # loads model and chains
+      watched.chain_price = price
+      self.watched[symbol] = watched
+
+    elif price == watched.quote_price:
+      return None
+
+    elif abs(np.log(price / watched.chain_price)) > self.move_threshold:
+      print(strformat(symbol, f"Moved to ${price} from ${watched.chain_price} - re-fetching chains"))
+      watched.build.strategy.reload_chains()
+      watched.chain_price = price
+
+    else:
+      watched.build.strategy.update_targets()
+
+    watched.quote_price = price
+    return watched.build.create_snapshot()
+
+  def cycle(self):
+    """
+    Yields snapshots updated since the last cycle.
+    """
+    self._tick()
+    quotes = get_quote_snapshot()
+    quotes.refresh(self.symbols)
+
+    for symbol in self.symbols:
+      price = quotes.get(symbol)
+      if price is None:
+        print(strformat(symbol, "Skipping - no quote"))
+        continue
+
+      try:
+        snapshot = self._update(symbol, price)
+      except Exception as e:
+        print(strformat(symbol, f"Skipping - {e}"))
+        if config.IS_DEBUG:
+          traceback.print_exc()
+        continue
+
+      if snapshot:
+        yield snapshot
+
+  def run(self, max_cycles=None):
+    """
+    Yields updated snapshots every interval until the market closes, always running at least one cycle.
+    """
+    num_cycles = 0
+    while True:
+      started_at = time.monotonic()
+      yield from self.cycle()
+      num_cycles += 1
+
+      if max_cycles and num_cycles >= max_cycles:
+        return
+
+      self._tick()
+      if not is_market_hours():
+        print(f"Market closed at {config.NOW} - stopping watch.")
+        return
+
+      self._sleep(max(0, self.interval - (time.monotonic() - started_at)))
@@ -0,0 +1,79 @@
+import contextlib
+import os
+import sys
+
+
+class SnapshotWriter:
+  """
+  Writes each snapshot's output rows as soon as it arrives.
+  """
+
+  def __init__(self, f):
+    self.f = f
+
+  def write(self, snapshot):
+    self._write_df(snapshot.to_output_df())
+    self.f.flush()
+
+  def _write_df(self, df):
+    raise NotImplementedError
+
+
+class NdjsonSnapshotWriter(SnapshotWriter):
+
+  def _write_df(self, df):
+    if len(df):
+      self.f.write(df.to_json(orient='records', lines=True, date_format='iso', date_unit='s', double_precision=15))
+
+
+class CsvSnapshotWriter(SnapshotWriter):
+
+  def __init__(self, f):
+    super().__init__(f)
+    self.columns = None
+
+  def _write_df(self, df):
+    # Header is fixed by the first snapshot so later rows line up.
+    is_first = self.columns is None
+    if is_first:
+      self.columns = list(df.columns)
+    df.reindex(columns=self.columns).to_csv(self.f, header=is_first, index=False)
+
+
+WRITERS = dict(
+  ndjson=NdjsonSnapshotWriter,
+  csv=CsvSnapshotWriter,
+)
+
+
+def make_snapshot_writer(fmt, f):
+  if fmt not in WRITERS:
+    raise ValueError(f"Invalid output format: {fmt}")
+  return WRITERS[fmt](f)
+
+
+def write_snapshots(snapshots, fmt, filepath=None):
+  """
+  Stream snapshots to filepath, or to stdout with other prints sent to stderr.
+  """
+  if filepath in (None, '-'):
+    # Rows go to a copy of stdout while fd 1 points at stderr, so prints of
+    # worker processes spawned meanwhile stay out of the stream too.
+    sys.stdout.flush()
+    stdout_fd = os.dup(1)
+    os.dup2(2, 1)
+    try:
+      with os.fdopen(os.dup(stdout_fd), 'w', newline='') as f, contextlib.redirect_stdout(sys.stderr):
+        writer = make_snapshot_writer(fmt, f)
+        for snapshot in snapshots:
+          writer.write(snapshot)
+    finally:
+      sys.stdout.flush()
+      os.dup2(stdout_fd, 1)
+      os.close(stdout_fd)
+    return
+
+  with open(filepath, 'w', newline='') as f:
+    writer = make_snapshot_writer(fmt, f)
+    for snapshot in snapshots:
+      writer.write(snapshot)